@@ -0,0 +1,171 @@
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+# Below this many rows an exact COUNT(*) is cheap enough
+ESTIMATE_THRESHOLD = 100_000
+# Filtered changelists count at most this many rows
+FILTERED_COUNT_LIMIT = 10_000
+
+
+def estimated_count(queryset):
+    """Row estimate the database keeps for the queryset's table, or None where it keeps none"""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql, params = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [connection.ops.quote_name(table)]
+    elif connection.vendor == 'mysql':
+        sql, params = (
+            'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+            [table],
+        )
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables that were never analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never runs an unbounded COUNT(*) on a large table.
+
+    Unfiltered lists use the table statistics once the table is past
+    ESTIMATE_THRESHOLD rows; filtered lists are counted up to
+    FILTERED_COUNT_LIMIT rows, beyond which the filter should be narrowed.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+            return queryset.count()
+        return queryset.order_by()[:FILTERED_COUNT_LIMIT].count()
+
+
+def _periods(first, last, kind):
+    """Every year, month or day start between two dates"""
+    if kind == 'year':
+        return [date(year, 1, 1) for year in range(first.year, last.year + 1)]
+    if kind == 'month':
+        return [
+            date(index // 12, index % 12 + 1, 1)
+            for index in range(first.year * 12 + first.month - 1, last.year * 12 + last.month)
+        ]
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+class IndexRangeDatesMixin:
+    """QuerySet mixin answering dates()/datetimes() on the hierarchy field from MIN/MAX.
+
+    The admin date hierarchy asks for the distinct years, months or days
+    in the list, which scans every matching row. Two index seeks for the
+    bounds give the same navigation, at the cost of listing empty periods.
+    """
+    hierarchy_field = None
+
+    def dates(self, field_name, kind, order='ASC'):
+        if field_name != self.hierarchy_field or kind not in ('year', 'month', 'day'):
+            return super().dates(field_name, kind, order)
+        return self._index_range_periods(field_name, kind, order)
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if field_name != self.hierarchy_field or kind not in ('year', 'month', 'day'):
+            return super().datetimes(field_name, kind, order, tzinfo)
+        return self._index_range_periods(field_name, kind, order, tzinfo)
+
+    def _index_range_periods(self, field_name, kind, order, tzinfo=None):
+        bounds = self.order_by().aggregate(first=Min(field_name), last=Max(field_name))
+        first, last = bounds['first'], bounds['last']
+        if first is None:
+            return []
+        aware = isinstance(first, datetime) and timezone.is_aware(first)
+        if isinstance(first, datetime):
+            if aware:
+                tzinfo = tzinfo or timezone.get_current_timezone()
+                first, last = timezone.localtime(first, tzinfo), timezone.localtime(last, tzinfo)
+            first, last = first.date(), last.date()
+        periods = _periods(first, last, kind)
+        if isinstance(bounds['first'], datetime):
+            periods = [datetime(period.year, period.month, period.day) for period in periods]
+            if aware:
+                periods = [timezone.make_aware(period, tzinfo) for period in periods]
+        return periods[::-1] if order == 'DESC' else periods
+
+
+@lru_cache(maxsize=None)
+def _index_range_class(queryset_class, field_name):
+    return type(
+        f'IndexRange{queryset_class.__name__}',
+        (IndexRangeDatesMixin, queryset_class),
+        {'hierarchy_field': field_name},
+    )
+
+
+class IndexRangeChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.date_hierarchy:
+            queryset.__class__ = _index_range_class(type(queryset), self.date_hierarchy)
+        return queryset
+
+
+class ScalableAdminMixin:
+    """ModelAdmin mixin for changelists over very large tables.
+
+    - joins every foreign key in list_display, plus the required foreign
+      keys of those related models, which their __str__ usually reads;
+    - shows related objects as raw ids in forms instead of a <select> of
+      every row;
+    - counts with EstimatedCountPaginator and skips the second full count
+      and the list_filter facet counts;
+    - builds date_hierarchy navigation from index range bounds.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def __init__(self, model, admin_site):
+        super().__init__(model, admin_site)
+        if not self.raw_id_fields:
+            self.raw_id_fields = tuple(
+                field.name for field in model._meta.get_fields()
+                if field.concrete and (field.many_to_one or field.one_to_one)
+            )
+
+    def get_list_select_related(self, request):
+        if self.list_select_related is not False:
+            return self.list_select_related
+        joins = []
+        for name in self.get_list_display(request):
+            if not isinstance(name, str):
+                continue
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                continue
+            joins.append(name)
+            joins.extend(
+                f'{name}__{related.name}' for related in field.related_model._meta.concrete_fields
+                if (related.many_to_one or related.one_to_one) and not related.null
+            )
+        return joins
+
+    def get_changelist(self, request, **kwargs):
+        return IndexRangeChangeList
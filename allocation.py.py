@@ -0,0 +1,165 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+
+from .cache import invalidate_booking_cache
+
+ACTIVE_STATUSES = ['pending', 'confirmed']
+
+
+def find_best_table(date, time_slot, guests, exclude_booking=None):
+    """Smallest available table seating guests that has no active booking in the slot"""
+    from .models import Booking, Table
+
+    taken = Booking.objects.filter(table=OuterRef('pk'), date=date, time_slot=time_slot, active=True)
+    if exclude_booking is not None:
+        taken = taken.exclude(pk=exclude_booking)
+    return Table.objects.filter(
+        is_available=True,
+        capacity__gte=guests,
+    ).exclude(Exists(taken)).order_by('capacity', 'number').first()
+
+
+def best_fit(guests, tables, current=None):
+    """Seat parties on tables, largest party first, each on the smallest table that fits.
+
+    guests maps booking id -> party size, tables is a list of (capacity, table id)
+    sorted ascending, current maps booking id -> table id it holds today. A booking
+    keeps its current table when that table is one of the smallest that fit.
+    Returns booking id -> table id, or None if some party cannot be seated.
+    """
+    current = current or {}
+    free = list(tables)
+    capacities = [capacity for capacity, _ in free]
+    held = set(current.values())
+    assignment = {}
+    for booking_id in sorted(guests, key=lambda booking_id: (-guests[booking_id], booking_id)):
+        index = bisect_left(capacities, guests[booking_id])
+        if index == len(free):
+            return None
+        # Among equally small tables prefer the one the booking already has,
+        # then one no other booking holds, to keep moves to a minimum
+        end = bisect_left(capacities, capacities[index] + 1, index)
+        candidates = range(index, end)
+        pick = next((i for i in candidates if free[i][1] == current.get(booking_id)), None)
+        if pick is None:
+            pick = next((i for i in candidates if free[i][1] not in held), index)
+        assignment[booking_id] = free[pick][1]
+        del free[pick]
+        del capacities[pick]
+    return assignment
+
+
+def repack(date):
+    """Re-seat a day's pending auto-assigned bookings with best fit to free up large tables.
+
+    Confirmed bookings and tables chosen by guests stay where they are. Two
+    queries read the day, and moved bookings are written with two UPDATEs.
+    Bookings changed since the read are left alone, and if a booking made
+    meanwhile holds a target table the day is skipped until the next run.
+    Returns the number of bookings that changed table.
+    """
+    from .models import Booking, Table
+
+    tables = sorted(
+        (capacity, table_id)
+        for table_id, capacity in Table.objects.filter(is_available=True).values_list('id', 'capacity')
+    )
+    slots = defaultdict(lambda: ({}, {}, set()))
+    rows = Booking.objects.filter(date=date, status__in=ACTIVE_STATUSES).values_list(
+        'id', 'time_slot', 'table_id', 'number_of_guests', 'status', 'table_auto_assigned'
+    )
+    for booking_id, time_slot, table_id, guests, status, auto_assigned in rows:
+        movable, current, fixed = slots[time_slot]
+        if status == 'pending' and auto_assigned:
+            movable[booking_id] = guests
+            current[booking_id] = table_id
+        else:
+            fixed.add(table_id)
+
+    moves = {}
+    for movable, current, fixed in slots.values():
+        if not movable:
+            continue
+        assignment = best_fit(movable, [table for table in tables if table[1] not in fixed], current)
+        if assignment is None:
+            continue
+        moves.update({
+            booking_id: (current[booking_id], table_id) for booking_id, table_id in assignment.items()
+            if table_id != current[booking_id]
+        })
+
+    if not moves:
+        return 0
+    try:
+        with transaction.atomic():
+            bookings = [
+                booking for booking in Booking.objects.select_for_update().filter(pk__in=moves, status='pending')
+                if booking.table_id == moves[booking.pk][0]
+            ]
+            # Release the moved bookings' slots first so swaps never collide on the unique constraint
+            Booking.objects.filter(pk__in=[booking.pk for booking in bookings]).update(active=None)
+            for booking in bookings:
+                booking.table_id = moves[booking.pk][1]
+                booking.active = True
+            Booking.objects.bulk_update(bookings, ['table', 'active'])
+            transaction.on_commit(invalidate_booking_cache)
+    except IntegrityError:
+        return 0
+    return len(bookings)
+
+
+def seat_from_waitlist(table, date, time_slot):
+    """Give a freed table to the best waiting party: the largest that fits, first come first served.
+
+    The lookup walks the waitlist priority index, so it costs O(log n)
+    however long the list is. Returns the new booking, or None, also when
+    someone else booked the table first; the entry then keeps waiting.
+    """
+    from .models import Booking, WaitlistEntry
+
+    if not table.is_available:
+        return None
+    try:
+        with transaction.atomic():
+            entry = WaitlistEntry.objects.select_for_update().filter(
+                date=date,
+                time_slot=time_slot,
+                status='waiting',
+                number_of_guests__lte=table.capacity,
+            ).order_by('-number_of_guests', 'created_at').first()
+            if entry is None:
+                return None
+            booking = Booking.objects.create(
+                user_id=entry.user_id,
+                table=table,
+                date=date,
+                time_slot=time_slot,
+                number_of_guests=entry.number_of_guests,
+                customer_name=entry.customer_name,
+                customer_email=entry.customer_email,
+                customer_phone=entry.customer_phone,
+                special_requests=entry.special_requests,
+                table_auto_assigned=True,
+            )
+            entry.status = 'seated'
+            entry.booking = booking
+            entry.save(update_fields=['status', 'booking', 'updated_at'])
+    except IntegrityError:
+        return None
+    return booking
+
+
+def expire_waitlist(now=None):
+    """Mark waiting entries whose slot has started as expired, with one UPDATE; returns the count"""
+    from django.db.models import Q
+    from django.utils import timezone
+
+    from .models import WaitlistEntry
+
+    now = timezone.localtime(now)
+    return WaitlistEntry.objects.filter(status='waiting').filter(
+        Q(date__lt=now.date()) | Q(date=now.date(), time_slot__lte=now.strftime('%H:%M'))
+    ).update(status='expired', updated_at=now)
@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .user_stats import unchanged
+
+ORDER_FINISHED_STATUSES = ['delivered', 'cancelled']
+BOOKING_FINISHED_STATUSES = ['completed', 'cancelled']
+
+
+def _copy(queryset, archive_model):
+    """Insert the queryset's rows into archive_model, column for column"""
+    columns = [field.attname for field in archive_model._meta.concrete_fields if field.name != 'archived_at']
+    archive_model.objects.bulk_create([archive_model(**row) for row in queryset.order_by().values(*columns)])
+
+
+def archivable_orders(cutoff):
+    from .models import Order
+
+    return Order.objects.filter(created_at__lt=cutoff, status__in=ORDER_FINISHED_STATUSES)
+
+
+def archivable_bookings(cutoff):
+    """Finished bookings before cutoff that no order left in the hot table points at"""
+    from .models import Booking, Order
+
+    return Booking.objects.filter(
+        date__lt=timezone.localtime(cutoff).date(), status__in=BOOKING_FINISHED_STATUSES
+    ).exclude(Exists(Order.objects.filter(booking=OuterRef('pk'))))
+
+
+def _archive(queryset, move, batch_size):
+    """Run move(ids) on batch_size rows of queryset at a time, each batch in its own transaction"""
+    moved = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                queryset.select_for_update().order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return moved
+            move(ids)
+        moved += len(ids)
+
+
+def _move_orders(ids):
+    from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+    _copy(Order.objects.filter(pk__in=ids), ArchivedOrder)
+    _copy(OrderItem.objects.filter(order_id__in=ids), ArchivedOrderItem)
+    # Deleting the orders takes their items with them; the counters include
+    # the archive, so they stay as they were
+    with unchanged():
+        Order.objects.filter(pk__in=ids).delete()
+
+
+def _move_bookings(ids):
+    from .models import ArchivedBooking, Booking
+
+    _copy(Booking.objects.filter(pk__in=ids), ArchivedBooking)
+    with unchanged():
+        Booking.objects.filter(pk__in=ids).delete()
+
+
+def archive_orders(cutoff, batch_size=500):
+    """Move finished orders created before cutoff, with their items, to the archive tables"""
+    return _archive(archivable_orders(cutoff), _move_orders, batch_size)
+
+
+def archive_bookings(cutoff, batch_size=500):
+    """Move finished bookings dated before cutoff to the archive table.
+
+    Run after archive_orders so the bookings of archived orders qualify.
+    """
+    return _archive(archivable_bookings(cutoff), _move_bookings, batch_size)
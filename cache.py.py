@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+MENU_VERSION_KEY = 'restaurant:menu:version'
+BOOKING_VERSION_KEY = 'restaurant:bookings:version'
+TABLE_VERSION_KEY = 'restaurant:tables:version'
+USER_VERSION_KEY = 'restaurant:users:version'
+LIST_CACHE_PREFIX = 'restaurant:list'
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 2, timeout=None)
+
+
+def menu_cache_version():
+    """Current menu generation; cached menu data is keyed by it"""
+    return _version(MENU_VERSION_KEY)
+
+
+def invalidate_menu_cache():
+    """Drop every cached menu entry at once by moving to a new version"""
+    _bump(MENU_VERSION_KEY)
+
+
+def booking_cache_version():
+    """Current bookings generation; cached availability is keyed by it"""
+    return _version(BOOKING_VERSION_KEY)
+
+
+def invalidate_booking_cache():
+    """Drop every cached availability entry at once by moving to a new version"""
+    _bump(BOOKING_VERSION_KEY)
+
+
+def table_cache_version():
+    """Current tables generation; the cached table list is keyed by it"""
+    return _version(TABLE_VERSION_KEY)
+
+
+def invalidate_table_cache():
+    """Drop the cached table list at once by moving to a new version"""
+    _bump(TABLE_VERSION_KEY)
+
+
+def user_cache_version():
+    """Current users generation; responses that embed user rows are validated by it"""
+    return _version(USER_VERSION_KEY)
+
+
+def invalidate_user_cache():
+    _bump(USER_VERSION_KEY)
+
+
+def _plain(data):
+    """Serializer output as plain dicts and lists, which pickle without the serializer"""
+    if isinstance(data, dict):
+        return {key: _plain(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_plain(value) for value in data]
+    return data
+
+
+class CachedListMixin:
+    """ViewSet mixin serving unfiltered list pages from the cache.
+
+    list_cache is (name, version callable); bumping the version drops every
+    page at once. Requests with any query parameter other than page are
+    built as usual. Entries are per host, as responses carry absolute URLs.
+    """
+    list_cache = None
+
+    def list(self, request, *args, **kwargs):
+        if self.list_cache is None or set(request.query_params) - {'page'}:
+            return super().list(request, *args, **kwargs)
+        name, version = self.list_cache
+        key = ':'.join([
+            LIST_CACHE_PREFIX, name, str(version()),
+            request.build_absolute_uri('/'), request.query_params.get('page', '1'),
+        ])
+        data = cache.get(key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            data = _plain(response.data)
+            cache.set(key, data, getattr(settings, 'LIST_CACHE_SECONDS', 3600))
+        return Response(data)
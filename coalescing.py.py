@@ -0,0 +1,97 @@
+import threading
+import time
+from functools import wraps
+
+from django.core.cache import cache
+
+COALESCE_PREFIX = 'restaurant:coalesce'
+# How often a process waiting on another process's computation checks the cache
+POLL_SECONDS = 0.02
+
+
+class _Flight:
+    """One in-progress computation that other threads of this process wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.failed = False
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(name, ttl=2, stale_ttl=None, version=None, lock_timeout=10):
+    """Decorator that computes func(*args) once per key, however many callers ask at once.
+
+    Results are cached for ttl seconds (the soft TTL). For stale_ttl more
+    seconds (default ttl) a stale result is still served while one caller
+    refreshes it. Concurrent misses are coalesced twice over: threads of a
+    process wait on the one computing, and processes wait on a cache lock
+    held by whichever started first. version, when given, is a callable
+    whose value is part of the key, so bumping it drops every result at once.
+    Arguments must have a stable str(); results must be picklable.
+    """
+    stale_ttl = ttl if stale_ttl is None else stale_ttl
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            key = ':'.join([COALESCE_PREFIX, name, str(version() if version else 0), *map(str, args)])
+            entry = cache.get(key)
+            if entry is not None:
+                value, fresh_until = entry
+                # Past the soft TTL one caller refreshes; the rest keep the stale value meanwhile
+                if time.time() < fresh_until or not cache.add(f'{key}:lock', 1, lock_timeout):
+                    return value
+                try:
+                    return _store(key, func(*args), ttl, stale_ttl)
+                finally:
+                    cache.delete(f'{key}:lock')
+
+            with _flights_lock:
+                flight = _flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = _flights[key] = _Flight()
+            if not leader:
+                if flight.done.wait(lock_timeout) and not flight.failed:
+                    return flight.value
+                return func(*args)
+
+            try:
+                flight.value = _compute(key, func, args, ttl, stale_ttl, lock_timeout)
+            except BaseException:
+                flight.failed = True
+                raise
+            finally:
+                flight.done.set()
+                with _flights_lock:
+                    _flights.pop(key, None)
+            return flight.value
+        return wrapper
+    return decorator
+
+
+def _store(key, value, ttl, stale_ttl):
+    cache.set(key, (value, time.time() + ttl), ttl + stale_ttl)
+    return value
+
+
+def _compute(key, func, args, ttl, stale_ttl, lock_timeout):
+    """Compute under a cross-process lock, or wait for the process that holds it"""
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + lock_timeout
+    while not cache.add(lock_key, 1, lock_timeout):
+        time.sleep(POLL_SECONDS)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        if time.monotonic() > deadline:
+            # The holder died or is too slow; do the work here rather than fail
+            return func(*args)
+    try:
+        return _store(key, func(*args), ttl, stale_ttl)
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,82 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """ViewSet mixin answering list and retrieve GETs with 304 when nothing changed.
+
+    The validators come from one aggregate query over the same filtered
+    queryset the response would be built from: MAX(conditional_field),
+    which is the Last-Modified, and COUNT, which catches deletions. The weak
+    ETag hashes these with the query string, media type and user, plus the
+    cache versions in conditional_versions for data the rows embed from
+    other tables, and conditional_aggregates() for values that change
+    without a write. A 304 is returned before any serializer runs.
+
+    Last-Modified is only sent where MAX(conditional_field) alone decides
+    the representation: a detail view with no versions or extra aggregates.
+    Lists change on deletions, which no timestamp records, so they and
+    everything else are validated on the ETag alone.
+
+    With conditional_field = None the ETag is made from the versions alone
+    and no query is made.
+    """
+    conditional_field = 'updated_at'
+    conditional_versions = ()
+
+    def conditional_aggregates(self):
+        return {}
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, args, kwargs, detail=False)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, args, kwargs, detail=True)
+
+    def _validators(self, request, detail):
+        """(etag, last modified timestamp or None), or None when no validator applies"""
+        parts = [request.get_full_path(), request.accepted_media_type or '', str(request.user.pk)]
+        last_modified = None
+        if self.conditional_field:
+            queryset = self.filter_queryset(self.get_queryset())
+            try:
+                if detail:
+                    lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+                    queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+                values = queryset.aggregate(
+                    last_modified=Max(self.conditional_field), count=Count('pk'), **self.conditional_aggregates()
+                )
+            except (TypeError, ValueError, ValidationError):
+                return None
+            # Missing objects get the regular 404
+            if detail and not values['count']:
+                return None
+            # HTTP dates have whole seconds
+            complete = detail and not self.conditional_versions and len(values) == 2
+            if complete and values['last_modified'] is not None:
+                last_modified = int(values['last_modified'].timestamp())
+            parts += [f'{key}={value}' for key, value in sorted(values.items())]
+        if not self.conditional_field and not self.conditional_versions:
+            return None
+        parts += [str(version()) for version in self.conditional_versions]
+        etag = 'W/' + quote_etag(hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest())
+        return etag, last_modified
+
+    def _conditional(self, request, handler, args, kwargs, detail):
+        validators = self._validators(request, detail)
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        etag, last_modified = validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,9 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+
+def day_bounds(day):
+    """[start, end) datetimes of a local calendar day, for range filters on datetime columns"""
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), datetime.min.time()))
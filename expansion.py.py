@@ -0,0 +1,112 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+from .sparse_fields import SAFE_METHODS
+
+EXPAND_PARAM = 'expand'
+
+
+def requested_expansions(request):
+    """Tree of paths from ?expand=items.menu_item,booking.table -> {'items': {'menu_item': {}}, 'booking': {'table': {}}}"""
+    if request is None or request.method not in SAFE_METHODS or not hasattr(request, 'query_params'):
+        return {}
+    tree = {}
+    for path in request.query_params.get(EXPAND_PARAM, '').split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+class ExpandableFieldsMixin:
+    """Serializer mixin that swaps fields named in ?expand= for nested serializers.
+
+    expandable_fields maps a field name to (serializer class, extra kwargs).
+    Nested serializers receive the rest of the path through the expand
+    keyword, so 'booking.table' expands booking and then its table.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+        if expand is None:
+            expand = requested_expansions(self.context.get('request'))
+        for name, children in expand.items():
+            if name in self.expandable_fields and name in self.fields:
+                serializer_class, options = self.expandable_fields[name]
+                if issubclass(serializer_class, ExpandableFieldsMixin):
+                    options = {**options, 'expand': children}
+                self.fields[name] = serializer_class(read_only=True, **options)
+
+
+def _forward_joins(model, source):
+    """select_related path for the foreign keys a dotted source walks through, if any"""
+    joins = []
+    for part in source.split('.')[:-1]:
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            break
+        if not (field.many_to_one or field.one_to_one):
+            break
+        joins.append(part)
+        model = field.related_model
+    return '__'.join(joins)
+
+
+def related_lookups(serializer):
+    """(select_related, prefetch_related) lookups covering every relation the serializer reads.
+
+    Each nested serializer becomes one lookup: a select_related path for
+    foreign keys, or one Prefetch whose queryset carries the nested
+    serializer's own joins for reverse relations. A page therefore costs
+    one query plus one per to-many level, whatever its size.
+    """
+    model = serializer.Meta.model
+    select, prefetch = [], []
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        child = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(child, serializers.BaseSerializer):
+            try:
+                relation = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            child_select, child_prefetch = related_lookups(child)
+            if relation.one_to_many or relation.many_to_many:
+                queryset = child.Meta.model._default_manager.all()
+                if child_select:
+                    queryset = queryset.select_related(*child_select)
+                if child_prefetch:
+                    queryset = queryset.prefetch_related(*child_prefetch)
+                prefetch.append(Prefetch(field.source, queryset=queryset))
+            else:
+                select.append(field.source)
+                select.extend(f'{field.source}__{lookup}' for lookup in child_select)
+                prefetch.extend(
+                    Prefetch(f'{field.source}__{lookup.prefetch_through}', queryset=lookup.queryset)
+                    for lookup in child_prefetch
+                )
+        elif '.' in field.source:
+            join = _forward_joins(model, field.source)
+            if join:
+                select.append(join)
+    return select, prefetch
+
+
+class ExpandableFieldsViewSetMixin:
+    """Add the select_related/prefetch_related lookups the (expanded) serializer needs"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        select, prefetch = related_lookups(self.get_serializer())
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
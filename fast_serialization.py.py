@@ -0,0 +1,149 @@
+import types
+from types import SimpleNamespace
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+# Fields whose to_representation returns the database value unchanged
+_PASSTHROUGH = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    PrimaryKeyRelatedField,
+)
+
+_compiled = {}
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _orm_path(model, source):
+    if '.' in source:
+        return source.replace('.', '__')
+    # Select foreign keys by attname: a values alias named like the relation
+    # would make Meta.ordering sort by the raw id instead of the related ordering.
+    try:
+        field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return source
+    return field.attname if field.many_to_one or field.one_to_one else source
+
+
+def _file_url(field):
+    """Mirror FileField.to_representation for a stored file name"""
+    storage = field.parent.Meta.model._meta.get_field(field.source).storage
+    request = field.context.get('request')
+
+    def convert(name):
+        if not name:
+            return None
+        if not getattr(field, 'use_url', True):
+            return name
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return convert
+
+
+def _converter(field):
+    """Callable applied to a non-null column value, or None when it passes through as is"""
+    if isinstance(field, serializers.FileField):
+        return _file_url(field)
+    if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is not None:
+        raise Unsupported(field.field_name)
+    if isinstance(field, _PASSTHROUGH):
+        return None
+    if isinstance(field, (serializers.BaseSerializer, serializers.RelatedField, serializers.ManyRelatedField)):
+        raise Unsupported(field.field_name)
+    return field.to_representation
+
+
+def _compile(serializer):
+    model = serializer.Meta.model
+    method_sources = getattr(serializer, 'fast_method_sources', {})
+    columns = []
+    bindings = []
+    entries = []
+
+    def column(path):
+        if path not in columns:
+            columns.append(path)
+        return columns.index(path)
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in method_sources:
+                raise Unsupported(name)
+            args = ', '.join(f'{attr}=row[{column(attr)}]' for attr in method_sources[name])
+            bindings.append(('method', name))
+            entries.append((name, f'_b{len(bindings) - 1}(_Row({args}))'))
+            continue
+        if field.source == '*':
+            raise Unsupported(name)
+        index = column(_orm_path(model, field.source))
+        if _converter(field) is None:
+            entries.append((name, f'row[{index}]'))
+        else:
+            bindings.append(('convert', name))
+            entries.append((name, f'(None if row[{index}] is None else _b{len(bindings) - 1}(row[{index}]))'))
+
+    body = ', '.join(f'{name!r}: {expression}' for name, expression in entries)
+    module = compile(f'def formatter(row):\n    return {{{body}}}\n', f'<{type(serializer).__name__} formatter>', 'exec')
+    code = next(const for const in module.co_consts if isinstance(const, types.CodeType))
+    return columns, code, bindings
+
+
+def compile_formatter(serializer):
+    """Build (columns, formatter) that turns values_list() rows into serializer output.
+
+    Plain model fields map to one column each. SerializerMethodFields need
+    the serializer to list the attributes their method reads in
+    ``fast_method_sources``. Anything else raises Unsupported.
+
+    The formatter code is compiled once per serializer class; only the
+    request-bound converters are looked up again for each serializer.
+    """
+    key = (type(serializer), tuple((name, type(field)) for name, field in serializer.fields.items()))
+    if key not in _compiled:
+        try:
+            _compiled[key] = _compile(serializer)
+        except Unsupported:
+            _compiled[key] = None
+    if _compiled[key] is None:
+        raise Unsupported(type(serializer).__name__)
+
+    columns, code, bindings = _compiled[key]
+    namespace = {'_Row': SimpleNamespace}
+    for index, (kind, name) in enumerate(bindings):
+        field = serializer.fields[name]
+        if kind == 'method':
+            namespace[f'_b{index}'] = getattr(serializer, field.method_name)
+        else:
+            namespace[f'_b{index}'] = _converter(field)
+    return columns, types.FunctionType(code, namespace)
+
+
+class FastListMixin:
+    """Serve list GETs from values_list() tuples instead of model instances.
+
+    The output is identical to the viewset's serializer; viewsets whose
+    serializer cannot be compiled fall back to the regular list().
+    """
+
+    def list(self, request, *args, **kwargs):
+        try:
+            columns, formatter = compile_formatter(self.get_serializer())
+        except Unsupported:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.filter_queryset(self.get_queryset()).values_list(*columns)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([formatter(row) for row in page])
+        return Response([formatter(row) for row in rows])
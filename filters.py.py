@@ -0,0 +1,10 @@
+import django_filters
+from .models import Booking
+
+class BookingFilter(django_filters.FilterSet):
+    # Filters on the annotation added by Booking.objects.with_past_due()
+    past_due = django_filters.BooleanFilter(field_name='past_due')
+    
+    class Meta:
+        model = Booking
+        fields = ['date', 'status', 'table', 'past_due']
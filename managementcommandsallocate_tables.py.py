@@ -0,0 +1,29 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from restaurant.allocation import repack
+
+class Command(BaseCommand):
+    help = 'Re-pack pending auto-assigned bookings onto the best fitting tables (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='First date to re-pack (YYYY-MM-DD), defaults to tomorrow')
+        parser.add_argument('--days', type=int, default=7, help='Number of days to re-pack')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                start = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid date, expected YYYY-MM-DD.')
+        else:
+            start = timezone.localdate() + timedelta(days=1)
+
+        for offset in range(options['days']):
+            day = start + timedelta(days=offset)
+            began = time.perf_counter()
+            moved = repack(day)
+            elapsed = (time.perf_counter() - began) * 1000
+            self.stdout.write(f'{day}: moved {moved} bookings in {elapsed:.1f}ms')
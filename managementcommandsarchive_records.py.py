@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from restaurant.archive import archivable_bookings, archivable_orders, archive_bookings, archive_orders
+
+class Command(BaseCommand):
+    help = 'Move finished bookings and orders older than the retention window to the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'ARCHIVE_RETENTION_DAYS', 365),
+                            help='Keep this many days of finished records in the hot tables')
+        parser.add_argument('--batch-size', type=int, default=500, help='Records moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        if options['dry_run']:
+            self.stdout.write(
+                f'Would archive {archivable_orders(cutoff).count()} orders and '
+                f'{archivable_bookings(cutoff).count()} bookings from before {cutoff:%Y-%m-%d}.'
+            )
+            return
+
+        orders = archive_orders(cutoff, options['batch_size'])
+        bookings = archive_bookings(cutoff, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {orders} orders and {bookings} bookings from before {cutoff:%Y-%m-%d}.'
+        ))
@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+
+USERNAME = 'benchmark-login-user'
+PASSWORD = 'Benchmark-passw0rd!'
+
+class Command(BaseCommand):
+    help = 'Measure read latency during a login burst with inline hashing and with the hashing pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=40, help='Concurrent logins in the burst')
+        parser.add_argument('--reads', type=int, default=200, help='Menu reads issued during the burst')
+        parser.add_argument('--read-interval', type=float, default=25, help='Milliseconds between reads')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Hashing pool size for the pooled run (default: PASSWORD_HASH_WORKERS)')
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='PBKDF2 iterations (default: PASSWORD_HASH_ITERATIONS)')
+
+    def handle(self, *args, **options):
+        # Every request gets its own client address so throttling does not skew the run
+        # (DRF identifies anonymous clients by X-Forwarded-For)
+        self.addresses = (f'10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}' for n in itertools.count(1))
+        overrides = {}
+        if options['iterations']:
+            overrides['PASSWORD_HASH_ITERATIONS'] = options['iterations']
+        workers = options['workers'] or getattr(settings, 'PASSWORD_HASH_WORKERS', 1) or 1
+        with override_settings(**overrides):
+            user = User(username=USERNAME)
+            user.set_password(PASSWORD)
+            user.save()
+            try:
+                self.stdout.write(
+                    f'{"mode":16} {"logins/s":>9} {"login p50":>10} {"read p50":>9} '
+                    f'{"read p95":>9} {"read max":>9}  statuses'
+                )
+                for label, size in [('reads only', None), ('inline hashing', 0),
+                                       (f'pool of {workers}', workers)]:
+                    with override_settings(PASSWORD_HASH_WORKERS=size or 0):
+                        self.report(label, asyncio.run(self.run(
+                            0 if size is None else options['logins'], options['reads'],
+                            options['read_interval'] / 1000
+                        )))
+            finally:
+                user.delete()
+
+    async def run(self, logins, reads, interval):
+        client = AsyncClient(HTTP_HOST='localhost')
+
+        async def timed(coro):
+            start = time.perf_counter()
+            response = await coro
+            return time.perf_counter() - start, response.status_code
+
+        async def reader(index):
+            # A steady stream of reads, as from customers browsing the menu
+            await asyncio.sleep(index * interval)
+            return await timed(client.get('/api/menu-items/', headers={'X-Forwarded-For': next(self.addresses)}))
+
+        start = time.perf_counter()
+        login_tasks = [
+            asyncio.create_task(timed(client.post(
+                '/api/auth/login/', {'username': USERNAME, 'password': PASSWORD},
+                content_type='application/json', headers={'X-Forwarded-For': next(self.addresses)},
+            )))
+            for _ in range(logins)
+        ]
+        read_results = await asyncio.gather(*(reader(index) for index in range(reads)))
+        login_results = await asyncio.gather(*login_tasks)
+        return time.perf_counter() - start, login_results, read_results
+
+    def report(self, label, result):
+        elapsed, logins, reads = result
+        read_times = sorted(duration for duration, _ in reads)
+        login_times = [duration for duration, _ in logins]
+        statuses = sorted({code for _, code in logins + reads})
+        self.stdout.write(
+            f'{label:16} {len(logins) / elapsed:9.1f} '
+            f'{(statistics.median(login_times) * 1000 if login_times else 0):8.0f}ms '
+            f'{statistics.median(read_times) * 1000:7.1f}ms '
+            f'{read_times[int(len(read_times) * 0.95) - 1] * 1000:7.1f}ms '
+            f'{read_times[-1] * 1000:7.1f}ms  {statuses}'
+        )
@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from restaurant.models import Order
+from restaurant.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+from restaurant.serializers import OrderSerializer
+
+class Command(BaseCommand):
+    help = 'Compare JSON and MessagePack rendering speed on large order lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=5000, help='Orders in the list')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per renderer')
+        parser.add_argument('--from-db', action='store_true',
+                            help='Render OrderSerializer output for stored orders instead of synthetic rows')
+
+    def handle(self, *args, **options):
+        if options['from_db']:
+            orders = Order.objects.select_related('user', 'booking').prefetch_related('items__menu_item')
+            data = OrderSerializer(orders[:options['orders']], many=True).data
+            label = f'{len(data)} serialized orders'
+        else:
+            data = self._synthetic(options['orders'])
+            label = f'{len(data)} synthetic orders with Decimal/datetime values'
+        self.stdout.write(label)
+
+        renderers = [('stdlib json', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('orjson', FastJSONRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('orjson is not installed; FastJSONRenderer uses the stdlib encoder.'))
+        if msgpack is not None:
+            renderers.append(('msgpack', MessagePackRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('msgpack is not installed; skipping MessagePack.'))
+
+        baseline = None
+        for name, renderer in renderers:
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                body = renderer.render(data)
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            baseline = baseline or best
+            self.stdout.write(
+                f'{name:12} {best * 1000:8.1f}ms  {len(body):>10} bytes  {baseline / best:5.1f}x'
+            )
+
+    def _synthetic(self, count):
+        now = timezone.now()
+        return [
+            {
+                'id': order_id,
+                'user': order_id % 50,
+                'user_name': f'guest{order_id % 50}',
+                'booking': None,
+                'booking_info': None,
+                'status': 'pending',
+                'total': Decimal('42.50'),
+                'special_instructions': '',
+                'items': [
+                    {
+                        'id': order_id * 10 + line,
+                        'menu_item': line,
+                        'menu_item_name': f'Dish {line}',
+                        'menu_item_price': Decimal('8.50'),
+                        'quantity': line,
+                        'unit_price': Decimal('8.50'),
+                        'price': Decimal('8.50') * line,
+                    }
+                    for line in range(1, 4)
+                ],
+                'created_at': now - timedelta(minutes=order_id),
+                'updated_at': now,
+            }
+            for order_id in range(count)
+        ]
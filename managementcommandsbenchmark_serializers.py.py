@@ -0,0 +1,67 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from restaurant.fast_serialization import compile_formatter
+from restaurant.models import MenuItem, Table, Booking
+from restaurant.serializers import MenuItemSerializer, TableSerializer, BookingSerializer
+
+class Command(BaseCommand):
+    help = 'Check that the values_list() list path renders identical JSON and compare throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Rows per list')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path')
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/api/'))
+        request.user = User(is_staff=True)
+        context = {'request': request}
+        renderer = JSONRenderer()
+
+        cases = [
+            ('menu-items', MenuItemSerializer, MenuItem.objects.all()),
+            ('tables', TableSerializer, Table.objects.all()),
+            ('bookings', BookingSerializer, Booking.objects.with_past_due()),
+        ]
+
+        failures = 0
+        for name, serializer_class, queryset in cases:
+            queryset = queryset[:options['limit']]
+            columns, formatter = compile_formatter(serializer_class(context=context))
+
+            def regular():
+                return renderer.render(serializer_class(list(queryset), many=True, context=context).data)
+
+            def fast():
+                return renderer.render([formatter(row) for row in queryset.values_list(*columns)])
+
+            expected, actual = regular(), fast()
+            if expected != actual:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'{name}: output differs from {serializer_class.__name__}'))
+                continue
+
+            regular_time = self._best(regular, options['repeat'])
+            fast_time = self._best(fast, options['repeat'])
+            rows = queryset.count()
+            self.stdout.write(
+                f'{name}: {rows} rows, {len(expected)} bytes identical  '
+                f'regular {regular_time * 1000:.1f}ms  fast {fast_time * 1000:.1f}ms  '
+                f'({regular_time / fast_time if fast_time else 0:.1f}x)'
+            )
+
+        if failures:
+            raise CommandError(f'{failures} serializers produced different output.')
+        self.stdout.write(self.style.SUCCESS('Fast list output matches the serializers.'))
+
+    def _best(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
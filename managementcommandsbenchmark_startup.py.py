@@ -0,0 +1,70 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Imports the project the way a worker does on boot
+COLD_START = (
+    'import django; django.setup(); '
+    'from django.core.wsgi import get_wsgi_application; get_wsgi_application(); '
+    'from django.urls import resolve; resolve("/api/")'
+)
+
+# Times requests that exercise only the middleware stack and URL resolution
+REQUEST_OVERHEAD = '''
+import json, sys, time
+import django; django.setup()
+from django.conf import settings
+from django.test import Client
+# Measure as production runs: the DEBUG error pages would dwarf the middleware
+settings.DEBUG, settings.ALLOWED_HOSTS = False, ["localhost"]
+client = Client(HTTP_HOST="localhost")
+paths, count = sys.argv[1].split(","), int(sys.argv[2])
+results = {}
+for path in paths:
+    for _ in range(50):
+        response = client.get(path)
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get(path)
+    results[path] = [response.status_code, (time.perf_counter() - start) / count * 1e6]
+print(json.dumps({"results": results, "modules": len(sys.modules)}))
+'''
+
+class Command(BaseCommand):
+    help = 'Measure cold start time and per-request middleware overhead of the full and API-only profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--starts', type=int, default=5, help='Cold starts timed per profile')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests timed per path')
+
+    def handle(self, *args, **options):
+        paths = ['/api/', '/api/__benchmark__/', '/admin/login/']
+        self.stdout.write(
+            f'{"profile":8} {"cold start":>11} {"modules":>8}  '
+            + '  '.join(f'{path:>22}' for path in paths)
+        )
+        for profile in ['full', 'api']:
+            env = {**os.environ, 'DJANGO_PROFILE': profile}
+            starts = []
+            for _ in range(options['starts']):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, '-c', COLD_START], env=env, cwd=settings.BASE_DIR, check=True)
+                starts.append(time.perf_counter() - start)
+            output = subprocess.run(
+                [sys.executable, '-c', REQUEST_OVERHEAD, ','.join(paths), str(options['requests'])],
+                env=env, cwd=settings.BASE_DIR, check=True, capture_output=True, text=True,
+            ).stdout
+            measured = json.loads(output.strip().splitlines()[-1])
+            self.stdout.write(
+                f'{profile:8} {statistics.median(starts) * 1000:9.0f}ms {measured["modules"]:>8}  '
+                + '  '.join(
+                    f'{measured["results"][path][1]:>13.0f}us ({measured["results"][path][0]})'
+                    for path in paths
+                )
+            )
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from restaurant.models import Order, OrderItem
+from restaurant.dates import day_bounds
+
+def plan_checks():
+    """(description, index the plan must use, queryset) for the order access patterns"""
+    today_start, today_end = day_bounds(timezone.localdate())
+    return [
+        ("a customer's orders, newest first", 'order_user_created_idx',
+         Order.objects.filter(user_id=1).order_by('-created_at')),
+        ('orders by status, newest first', 'order_status_created_idx',
+         Order.objects.filter(status='pending').order_by('-created_at')),
+        ("today's orders and revenue", 'order_created_total_idx',
+         Order.objects.filter(created_at__gte=today_start, created_at__lt=today_end).values_list('total')),
+        ('popular menu items', 'orderitem_menu_quantity_idx',
+         OrderItem.objects.values('menu_item').annotate(total_ordered=Sum('quantity')).order_by()),
+    ]
+
+class Command(BaseCommand):
+    help = 'Fail if the order and order item queries stop using their indexes (EXPLAIN)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan')
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Small tables are cheaper to scan; ask whether the index is usable at all
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for description, index, queryset in plan_checks():
+                plan = queryset.explain()
+                if index in plan:
+                    self.stdout.write(f'ok    {description} ({index})')
+                else:
+                    failures.append(description)
+                    self.stdout.write(self.style.ERROR(f'FAIL  {description}: {index} not used'))
+                if options['verbose_plans'] or index not in plan:
+                    self.stdout.write(plan)
+        if failures:
+            raise CommandError(f'{len(failures)} queries no longer use their index.')
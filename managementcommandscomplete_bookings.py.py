@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from restaurant.allocation import expire_waitlist
+from restaurant.models import Booking
+
+class Command(BaseCommand):
+    help = 'Mark past-due pending and confirmed bookings as completed and expire their waitlist entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-days', type=int, default=7, help='Number of dates updated per UPDATE statement')
+        parser.add_argument('--loop', action='store_true', help='Keep running as a background worker')
+        parser.add_argument('--interval', type=int, default=300, help='Seconds between sweeps when looping')
+
+    def handle(self, *args, **options):
+        while True:
+            updated = Booking.objects.complete_past_due(batch_days=options['batch_days'])
+            expired = expire_waitlist()
+            self.stdout.write(f'Completed {updated} past-due bookings, expired {expired} waitlist entries.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from restaurant.user_stats import BATCH_SIZE, rebuild_user_stats
+
+class Command(BaseCommand):
+    help = ("Recompute every user's booking and order counters from the hot and archive tables "
+            "(run nightly to correct writes made with QuerySet.update())")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Users per round of grouped queries')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_user_stats(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt activity counters for {rebuilt} users.'))
@@ -0,0 +1,138 @@
+import http.client
+import ipaddress
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+from restaurant.traffic import read_log
+
+# Local accounts the replay authenticates as, by the kind of user recorded
+REPLAY_USERS = {
+    'user': ('replay-user', False),
+    'staff': ('replay-staff', True),
+}
+
+
+def _percentile(values, share):
+    """Nearest-rank percentile of sorted values"""
+    return values[max(0, min(len(values) - 1, round(share * len(values)) - 1))]
+
+
+def _is_local(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class Command(BaseCommand):
+    help = 'Replay a recorded traffic log against a local server and report latency per route'
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', help='Traffic log written by TrafficRecorderMiddleware (TRAFFIC_LOG_PATH)')
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Local server to replay against')
+        parser.add_argument('--speed', type=float, action='append', dest='speeds',
+                            help='Speed multiplier, e.g. 2 replays an hour in 30 minutes (repeatable; default 1)')
+        parser.add_argument('--clients', type=int, default=50, help='Concurrent client connections')
+        parser.add_argument('--limit', type=int, default=None, help='Replay only the first N requests')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed')
+
+    def handle(self, *args, **options):
+        target = urlsplit(options['base_url'])
+        if target.scheme not in ('http', 'https') or not _is_local(target.hostname or ''):
+            raise CommandError('Traffic is only replayed against a local server (localhost or a loopback address).')
+        records = read_log(options['log'])[:options['limit']]
+        if not records:
+            raise CommandError('The traffic log is empty.')
+
+        # The server must share this database for the tokens to be valid
+        tokens = {}
+        for kind, (username, is_staff) in REPLAY_USERS.items():
+            user, created = User.objects.get_or_create(username=username, defaults={'is_staff': is_staff})
+            if created:
+                user.set_unusable_password()
+                user.save(update_fields=['password'])
+            tokens[kind] = Token.objects.get_or_create(user=user)[0].key
+
+        self.stdout.write(f'Replaying {len(records)} requests against {options["base_url"]} '
+                          f'with {options["clients"]} clients.')
+        for speed in options['speeds'] or [1.0]:
+            self.report(speed, self.replay(target, records, tokens, speed, options))
+
+    def replay(self, target, records, tokens, speed, options):
+        """Send every record at its recorded offset divided by speed; returns the results and wall time"""
+        local = threading.local()
+        connection_class = http.client.HTTPSConnection if target.scheme == 'https' else http.client.HTTPConnection
+
+        def send(record, due):
+            # One keep-alive connection per client thread
+            if getattr(local, 'connection', None) is None:
+                local.connection = connection_class(target.hostname, target.port, timeout=options['timeout'])
+            path = record['path']
+            if record['query']:
+                path += '?' + urlencode(record['query'], doseq=True)
+            headers = {'Accept': 'application/json'}
+            body = None
+            if record['body'] is not None:
+                body = json.dumps(record['body'])
+                headers['Content-Type'] = 'application/json'
+            if record['user'] in tokens:
+                headers['Authorization'] = f'Token {tokens[record["user"]]}'
+            start = time.perf_counter()
+            try:
+                local.connection.request(record['method'], path, body=body, headers=headers)
+                response = local.connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                local.connection.close()
+                local.connection = None
+                status = 0
+            return record, status, time.perf_counter() - start, start - due
+
+        first = records[0]['t']
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options['clients'])) as executor:
+            futures = []
+            for record in records:
+                due = started + (record['t'] - first) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(send, record, due))
+            results = [future.result() for future in futures]
+        return results, time.perf_counter() - started
+
+    def report(self, speed, outcome):
+        results, elapsed = outcome
+        by_route = defaultdict(list)
+        for record, status, duration, lag in results:
+            by_route[f'{record["method"]} {record["route"] or record["path"]}'].append((record, status, duration))
+
+        lags = sorted(lag for *_, lag in results)
+        self.stdout.write(
+            f'\nspeed x{speed:g}: {len(results)} requests in {elapsed:.1f}s '
+            f'({len(results) / elapsed:.1f} req/s), dispatch lag p95 {_percentile(lags, 0.95) * 1000:.0f}ms'
+        )
+        self.stdout.write(
+            f'{"route":48} {"count":>6} {"req/s":>7} {"errors":>6} {"p50":>8} {"p95":>8} '
+            f'{"p99":>8} {"max":>8} {"recorded p50":>13}'
+        )
+        for route, rows in sorted(by_route.items(), key=lambda item: -len(item[1])):
+            durations = sorted(duration * 1000 for _, _, duration in rows)
+            recorded = sorted(record['ms'] for record, _, _ in rows)
+            # Recorded 4xx answers replay as 4xx; only server errors and failures count
+            errors = sum(1 for _, status, _ in rows if status == 0 or status >= 500)
+            self.stdout.write(
+                f'{route[:48]:48} {len(rows):6} {len(rows) / elapsed:7.1f} {errors:6} '
+                f'{_percentile(durations, 0.5):6.1f}ms {_percentile(durations, 0.95):6.1f}ms '
+                f'{_percentile(durations, 0.99):6.1f}ms {durations[-1]:6.1f}ms {_percentile(recorded, 0.5):11.1f}ms'
+            )
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from restaurant.outbox import BATCH_SIZE, process_batch
+
+class Command(BaseCommand):
+    help = 'Run the side effects recorded in the transactional outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Events claimed per transaction')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait when no event is due')
+        parser.add_argument('--once', action='store_true', help='Drain the due events and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            succeeded, failed = process_batch(options['batch_size'])
+            if succeeded or failed:
+                self.stdout.write(f'Processed {succeeded} outbox events, {failed} failed.')
+            # A full batch means more are probably waiting
+            if succeeded + failed < options['batch_size']:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from restaurant.models import SlowQuery
+
+class Command(BaseCommand):
+    help = 'Show the slowest recorded queries aggregated by fingerprint'
+
+    ORDERINGS = {
+        'total': '-total_ms',
+        'max': '-max_ms',
+        'count': '-count',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10, help='Number of fingerprints to show')
+        parser.add_argument('--order-by', choices=sorted(self.ORDERINGS), default='total')
+        parser.add_argument('--explain', action='store_true', help='Include the captured EXPLAIN output')
+        parser.add_argument('--reset', action='store_true', help='Delete all recorded slow queries')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} slow query records.'))
+            return
+
+        queries = SlowQuery.objects.order_by(self.ORDERINGS[options['order_by']])[:options['limit']]
+        if not queries:
+            self.stdout.write('No slow queries recorded.')
+            return
+
+        for query in queries:
+            average = query.total_ms / query.count if query.count else 0
+            self.stdout.write(self.style.WARNING(
+                f'{query.fingerprint}  {query.count}x  total {query.total_ms:.1f}ms  '
+                f'avg {average:.1f}ms  max {query.max_ms:.1f}ms  view {query.view_name or "-"}'
+            ))
+            self.stdout.write(f'  {query.normalized_sql}')
+            self.stdout.write(f'  param types: {query.sample_params}')
+            if options['explain'] and query.explain:
+                for line in query.explain.splitlines():
+                    self.stdout.write(f'    {line}')
+            self.stdout.write('')
@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from restaurant.models import Table
+from restaurant.views import (
+    CategoryViewSet, MenuItemViewSet, TableViewSet, compute_available_slots, compute_dashboard_stats
+)
+
+LISTS = [
+    ('category-list', CategoryViewSet),
+    ('menuitem-list', MenuItemViewSet),
+    ('table-list', TableViewSet),
+]
+
+
+def _default_host():
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = 'Fill the shared cache with the menu, tables, availability and dashboard before taking traffic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=14, help='Days of available slots to compute, from today')
+        parser.add_argument('--workers', type=int, default=8, help='Threads computing entries in parallel')
+        parser.add_argument('--host', action='append', dest='hosts',
+                            help='Public host name the lists are built for (repeatable; default: ALLOWED_HOSTS)')
+        parser.add_argument('--secure', action='store_true', help='Build list URLs for https')
+
+    def handle(self, *args, **options):
+        if isinstance(caches['default'], (LocMemCache, DummyCache)):
+            self.stderr.write(self.style.WARNING(
+                'The default cache is local to this process, so the web workers will not see these entries.'
+            ))
+
+        # Every party size that some table seats; larger parties have no slots to cache
+        largest = Table.objects.filter(is_available=True).aggregate(largest=Max('capacity'))['largest'] or 0
+        today = timezone.localdate()
+        tasks = [('dashboard', compute_dashboard_stats, ())]
+        tasks += [
+            (f'{day} for {guests}', compute_available_slots, (day, guests))
+            for day in (today + timedelta(days=offset) for offset in range(options['days']))
+            for guests in range(1, largest + 1)
+        ]
+        tasks += [
+            (f'{name} on {host}', self.build_list, (host, name, viewset, options['secure']))
+            for host in options['hosts'] or [_default_host()]
+            for name, viewset in LISTS
+        ]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            failures = [
+                f'{label}: {error}'
+                for label, error in executor.map(lambda task: self.run(*task), tasks) if error
+            ]
+        elapsed = time.perf_counter() - started
+        if failures:
+            raise CommandError('Could not warm ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS(f'Warmed {len(tasks)} cache entries in {elapsed:.1f}s.'))
+
+    def run(self, label, func, args):
+        try:
+            func(*args)
+        except Exception as e:
+            return label, f'{type(e).__name__}: {e}'
+        finally:
+            # Each pool thread opened its own connection
+            connections.close_all()
+        return label, None
+
+    def build_list(self, host, name, viewset, secure):
+        """Run the list view for host as a staff user, which stores its first page in the cache"""
+        request = APIRequestFactory().get(reverse(name), HTTP_HOST=host, secure=secure)
+        force_authenticate(request, user=User(username='warm_caches', is_staff=True))
+        response = viewset.as_view({'get': 'list'}, throttle_classes=[])(request)
+        if response.status_code != 200:
+            raise RuntimeError(f'status {response.status_code}')
@@ -0,0 +1,47 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class SiteOnlyMiddleware:
+    """Run SITE_ONLY_MIDDLEWARE for every path outside API_PATH_PREFIX.
+
+    Used by the API-only profile: token-authenticated /api/ requests skip
+    sessions, CSRF, auth, messages and clickjacking, while /admin/ keeps
+    them all. The wrapped middleware's process_view hooks (CSRF checks
+    there) are called for site paths as Django would call them.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.prefix = getattr(settings, 'API_PATH_PREFIX', '/api/')
+        handler = get_response
+        self.view_hooks = []
+        for path in reversed(getattr(settings, 'SITE_ONLY_MIDDLEWARE', [])):
+            handler = import_string(path)(handler)
+            if hasattr(handler, 'process_view'):
+                self.view_hooks.insert(0, handler.process_view)
+        self.site_handler = handler
+
+    def _is_api(self, request):
+        return request.path_info.startswith(self.prefix)
+
+    def __call__(self, request):
+        # In an async stack both handlers return coroutines for the caller to await
+        if self._is_api(request):
+            return self.get_response(request)
+        return self.site_handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self._is_api(request):
+            return None
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
@@ -1,7 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.db.models.functions import Round
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -15,6 +20,30 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class MenuItemQuerySet(models.QuerySet):
+    MAX_PRICE = Decimal('9999.99')
+    
+    def apply_changes(self, price=None, percentage=None, is_available=None):
+        """Set price (absolute or by percentage) and/or availability with one UPDATE"""
+        from .cache import invalidate_menu_cache
+        
+        changes = {'updated_at': timezone.now()}
+        if price is not None:
+            changes['price'] = price
+        elif percentage is not None:
+            factor = 1 + Decimal(percentage) / 100
+            highest = self.aggregate(highest=models.Max('price'))['highest'] or 0
+            if factor < 0 or highest * factor > self.MAX_PRICE:
+                raise ValueError(f"Prices must stay between 0 and {self.MAX_PRICE}.")
+            changes['price'] = Round(models.F('price') * factor, 2)
+        if is_available is not None:
+            changes['is_available'] = is_available
+        
+        with transaction.atomic():
+            updated = self.update(**changes)
+            transaction.on_commit(invalidate_menu_cache)
+        return updated
+
 class MenuItem(models.Model):
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=6, decimal_places=2)
@@ -25,6 +54,8 @@ class MenuItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = MenuItemQuerySet.as_manager()
+    
     class Meta:
         ordering = ['category', 'name']
         indexes = [
@@ -34,6 +65,16 @@ class MenuItem(models.Model):
     
     def __str__(self):
         return f"{self.name} - ${self.price}"
+    
+    def save(self, *args, **kwargs):
+        new_upload = bool(self.image) and not self.image._committed
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # The outbox worker builds the resized renditions off the request path
+            if new_upload:
+                from .outbox import enqueue
+                enqueue('menu.renditions', image_name=self.image.name)
 
 class Table(models.Model):
     TABLE_SIZES = [
@@ -55,6 +96,53 @@ class Table(models.Model):
     def __str__(self):
         return f"Table {self.number} ({self.capacity} persons)"
 
+class BookingQuerySet(models.QuerySet):
+    def past_due_q(self, now=None):
+        """Q matching bookings whose date and time slot are before now (local time)"""
+        now = timezone.localtime(now)
+        return models.Q(date__lt=now.date()) | models.Q(date=now.date(), time_slot__lte=now.strftime('%H:%M'))
+    
+    def past_due(self, now=None):
+        return self.filter(self.past_due_q(now))
+    
+    def with_past_due(self, now=None):
+        """Annotate past_due so lists can filter and order on it in the database"""
+        return self.annotate(
+            past_due=models.ExpressionWrapper(self.past_due_q(now), output_field=models.BooleanField())
+        )
+    
+    def complete_past_due(self, now=None, batch_days=7):
+        """Move past-due pending/confirmed bookings to completed, one UPDATE per date batch"""
+        now = timezone.localtime(now)
+        open_bookings = self.filter(status__in=['pending', 'confirmed'])
+        first_date = open_bookings.filter(date__lte=now.date()).order_by('date').values_list('date', flat=True).first()
+        updated = 0
+        if first_date is None:
+            return updated
+        
+        batch_start = first_date
+        while batch_start < now.date():
+            batch_end = min(batch_start + timedelta(days=batch_days), now.date())
+            updated += self._complete(open_bookings.filter(date__gte=batch_start, date__lt=batch_end), now)
+            batch_start = batch_end
+        
+        # Today only the slots that have already started
+        updated += self._complete(open_bookings.filter(date=now.date(), time_slot__lte=now.strftime('%H:%M')), now)
+        if updated:
+            from .cache import invalidate_booking_cache
+            transaction.on_commit(invalidate_booking_cache)
+        return updated
+
+    def _complete(self, bookings, now):
+        """Mark bookings completed and queue their owners' stats refresh, in one transaction"""
+        from .outbox import enqueue_many
+        
+        with transaction.atomic():
+            user_ids = list(bookings.order_by().values_list('user_id', flat=True).distinct())
+            updated = bookings.update(status='completed', updated_at=now)
+            enqueue_many('user.stats', [{'user_id': user_id} for user_id in user_ids])
+        return updated
+
 class Booking(models.Model):
     TIME_SLOTS = [
         ('17:00', '5:00 PM'),
@@ -84,16 +172,26 @@ class Booking(models.Model):
     customer_phone = models.CharField(max_length=15)
     special_requests = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # True while the booking holds its table; NULL once cancelled so the
+    # unique constraint below lets the table be booked again
+    active = models.BooleanField(null=True, default=True, editable=False)
+    table_auto_assigned = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = BookingQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-date', '-time_slot']
-        unique_together = ['table', 'date', 'time_slot']
+        constraints = [
+            models.UniqueConstraint(fields=['table', 'date', 'time_slot', 'active'], name='unique_active_table_slot'),
+        ]
         indexes = [
             models.Index(fields=['date', 'time_slot']),
             models.Index(fields=['status']),
             models.Index(fields=['user', 'created_at']),
+            # Covers the occupancy report's grouped scan over a date range
+            models.Index(fields=['date', 'active', 'table', 'time_slot', 'number_of_guests'], name='booking_occupancy_idx'),
         ]
     
     def __str__(self):
@@ -101,16 +199,60 @@ class Booking(models.Model):
     
     def is_past_due(self):
         """Check if booking date is in the past"""
-        from django.utils import timezone
         from datetime import datetime
-        booking_datetime = datetime.combine(self.date, datetime.strptime(self.time_slot, '%H:%M').time())
+        booking_datetime = timezone.make_aware(
+            datetime.combine(self.date, datetime.strptime(self.time_slot, '%H:%M').time())
+        )
         return booking_datetime < timezone.now()
     
     def save(self, *args, **kwargs):
-        # Auto-update status for past bookings
-        if self.is_past_due() and self.status not in ['cancelled', 'completed']:
-            self.status = 'completed'
-        super().save(*args, **kwargs)
+        self.active = None if self.status == 'cancelled' else True
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'active'}
+        from .outbox import enqueue
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # The owner's activity counters are refreshed off the request path
+            enqueue('user.stats', user_id=self.user_id)
+
+class WaitlistEntry(models.Model):
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('seated', 'Seated'),
+        ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    date = models.DateField()
+    time_slot = models.CharField(max_length=5, choices=Booking.TIME_SLOTS)
+    number_of_guests = models.IntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(20)]
+    )
+    customer_name = models.CharField(max_length=100)
+    customer_email = models.EmailField()
+    customer_phone = models.CharField(max_length=15)
+    special_requests = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entry')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Waitlist entries"
+        ordering = ['date', 'time_slot', 'created_at']
+        indexes = [
+            # Priority order: largest party that fits a freed table, then first come
+            models.Index(
+                fields=['date', 'time_slot', 'status', '-number_of_guests', 'created_at'],
+                name='waitlist_priority_idx'
+            ),
+            models.Index(fields=['user', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"Waitlist #{self.id} - {self.customer_name} - {self.date} {self.time_slot} ({self.number_of_guests})"
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -122,6 +264,16 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    # Statuses each status may move to through the bulk kitchen endpoint
+    STATUS_TRANSITIONS = {
+        'pending': ['confirmed', 'preparing', 'cancelled'],
+        'confirmed': ['preparing', 'cancelled'],
+        'preparing': ['ready', 'cancelled'],
+        'ready': ['delivered'],
+        'delivered': [],
+        'cancelled': [],
+    }
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -132,9 +284,25 @@ class Order(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A customer's orders, newest first
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            # Kitchen queues and pending counts by status, newest first
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            # Date ranges and the admin date hierarchy; total makes revenue sums index-only
+            models.Index(fields=['created_at', 'total'], name='order_created_total_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.id} - {self.user.username} - ${self.total}"
+    
+    def save(self, *args, **kwargs):
+        from .outbox import enqueue
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # The owner's activity counters are refreshed off the request path
+            enqueue('user.stats', user_id=self.user_id)
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -145,15 +313,243 @@ class OrderItem(models.Model):
     
     class Meta:
         unique_together = ['order', 'menu_item']
+        indexes = [
+            # Popular items: quantities grouped by menu item, read from the index alone
+            models.Index(fields=['menu_item', 'quantity'], name='orderitem_menu_quantity_idx'),
+        ]
     
     def __str__(self):
         return f"{self.quantity}x {self.menu_item.name} - ${self.price}"
     
-    def save(self, *args, **kwargs):
+    def set_price(self):
         self.unit_price = self.menu_item.price
         self.price = self.unit_price * self.quantity
-        super().save(*args, **kwargs)
+    
+    def save(self, *args, **kwargs):
+        from .outbox import enqueue
+        
+        self.set_price()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # The order total is recomputed by the outbox worker, off the request path
+            enqueue('order.recalculate_total', order_id=self.order_id)
+    
+    def delete(self, *args, **kwargs):
+        from .outbox import enqueue
         
-        # Update order total
-        self.order.total = sum(item.price for item in self.order.items.all())
-        self.order.save()
\ No newline at end of file
+        with transaction.atomic():
+            enqueue('order.recalculate_total', order_id=self.order_id)
+            return super().delete(*args, **kwargs)
+
+class ArchivedBooking(models.Model):
+    """Finished booking moved out of the hot table by the archive_records command"""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    table = models.ForeignKey(Table, on_delete=models.SET_NULL, null=True, related_name='+')
+    date = models.DateField()
+    time_slot = models.CharField(max_length=5, choices=Booking.TIME_SLOTS)
+    number_of_guests = models.IntegerField()
+    customer_name = models.CharField(max_length=100)
+    customer_email = models.EmailField()
+    customer_phone = models.CharField(max_length=15)
+    special_requests = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-date', '-time_slot']
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['user', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"Archived booking #{self.id} - {self.customer_name} - {self.date} {self.time_slot}"
+
+class ArchivedOrder(models.Model):
+    """Finished order moved out of the hot table by the archive_records command"""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    # The booking may still be hot or already archived, so only its id is kept
+    booking_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    total = models.DecimalField(max_digits=8, decimal_places=2)
+    special_instructions = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Archived order #{self.id} - ${self.total}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.SET_NULL, null=True, related_name='+')
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=6, decimal_places=2)
+    price = models.DecimalField(max_digits=6, decimal_places=2)
+    
+    def __str__(self):
+        return f"{self.quantity}x item #{self.menu_item_id} - ${self.price}"
+
+class OrderEvent(models.Model):
+    """Append-only change log for orders; the id is the cursor clients resume from"""
+    EVENT_TYPES = [
+        ('created', 'Created'),
+        ('status', 'Status changed'),
+    ]
+    
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, related_name='events')
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    previous_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"Event #{self.id} - Order #{self.order_id} {self.event_type} {self.status}"
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'order_id': self.order_id,
+            'status': self.status,
+            'previous_status': self.previous_status,
+            'created_at': self.created_at.isoformat(),
+        }
+
+class UserStats(models.Model):
+    """A customer's activity counters, refreshed by the outbox worker after booking and order writes.
+
+    Saves and every kind of delete (admin bulk delete, cascades) queue the
+    refresh. QuerySet.update() does not: code that changes a booking's or
+    order's status or total with it must enqueue 'user.stats' itself, as
+    complete_past_due and bulk_update_status do. The nightly
+    rebuild_user_stats run catches anything that slips through.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    booking_count = models.PositiveIntegerField(default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    last_visit = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "User stats"
+    
+    def __str__(self):
+        return f"Stats for user #{self.user_id}"
+
+class OutboxEvent(models.Model):
+    """Side effect recorded in the same transaction as the write that caused it.
+
+    run_outbox_worker runs the handler registered for the topic and deletes
+    the row; events that keep failing stay behind with status failed.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('failed', 'Failed'),
+    ]
+    
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # The worker's scan for due events
+            models.Index(fields=['status', 'available_at'], name='outbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Outbox event #{self.id} - {self.topic} ({self.status})"
+
+class SlowQuery(models.Model):
+    """Aggregated record of ORM queries that exceeded SLOW_QUERY_THRESHOLD_MS"""
+    fingerprint = models.CharField(max_length=32, unique=True)
+    normalized_sql = models.TextField()
+    sample_sql = models.TextField()
+    # Types of the sample's parameters only; values may be credentials
+    sample_params = models.TextField(blank=True)
+    view_name = models.CharField(max_length=200, blank=True)
+    explain = models.TextField(blank=True)
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Slow queries"
+        ordering = ['-total_ms']
+    
+    def __str__(self):
+        return f"{self.fingerprint} - {self.count}x - {self.total_ms:.0f}ms"
+
+# Cache invalidation runs from signals so that queryset deletes (the admin's
+# delete selected action) and cascades are covered, not only Model.save/delete;
+# QuerySet.update() callers invalidate themselves
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def invalidate_menu(sender, **kwargs):
+    """Menu items carry their category's name, so a category change drops the cached menu too"""
+    from .cache import invalidate_menu_cache
+    transaction.on_commit(invalidate_menu_cache)
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def invalidate_tables(sender, **kwargs):
+    """The cached table list and availability both depend on the tables"""
+    from .cache import invalidate_booking_cache, invalidate_table_cache
+    transaction.on_commit(invalidate_table_cache)
+    transaction.on_commit(invalidate_booking_cache)
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_bookings(sender, **kwargs):
+    """Cached availability must not outlive a change to the bookings"""
+    from .cache import invalidate_booking_cache
+    transaction.on_commit(invalidate_booking_cache)
+
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=Order)
+def refresh_owner_stats(sender, instance, **kwargs):
+    """Queue the owner's counters refresh on every delete path, in the deleting transaction"""
+    from .outbox import enqueue
+    from .user_stats import refresh_paused
+    
+    if not refresh_paused():
+        enqueue('user.stats', user_id=instance.user_id)
+
+# Fields written on every sign-in that no response shows
+_UNSHOWN_USER_FIELDS = {'last_login', 'password'}
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_embedded_users(sender, update_fields=None, **kwargs):
+    """Move ETags of bookings and orders, which embed their user, to a new version"""
+    from .cache import invalidate_user_cache
+    
+    if update_fields is None or not set(update_fields) <= _UNSHOWN_USER_FIELDS:
+        transaction.on_commit(invalidate_user_cache)
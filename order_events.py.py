@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.core import signing
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+POLL_INTERVAL = 0.5
+BUFFER_SIZE = 2000
+FETCH_SIZE = 500
+# How long to wait for a lower id that was allocated but not yet committed
+GAP_GRACE = timedelta(seconds=5)
+# Long enough to open the feed and ride out EventSource's automatic reconnects
+STREAM_TICKET_SECONDS = 60
+STREAM_TICKET_SALT = 'restaurant.order-stream-ticket'
+
+
+def record_order_events(orders, event_type, previous_statuses=None):
+    """Append one change event per order in a single INSERT"""
+    from .models import OrderEvent
+
+    previous_statuses = previous_statuses or {}
+    events = OrderEvent.objects.bulk_create([
+        OrderEvent(
+            order=order,
+            event_type=event_type,
+            status=order.status,
+            previous_status=previous_statuses.get(order.pk, ''),
+        )
+        for order in orders
+    ])
+    transaction.on_commit(broker.wake)
+    return events
+
+
+def issue_stream_ticket(user):
+    """Signed ticket that opens the order feed as user for STREAM_TICKET_SECONDS; nothing else accepts it"""
+    return signing.TimestampSigner(salt=STREAM_TICKET_SALT).sign(str(user.pk))
+
+
+def stream_ticket_user_id(ticket):
+    """Id of the user a valid, unexpired stream ticket was issued to, or None"""
+    try:
+        return int(signing.TimestampSigner(salt=STREAM_TICKET_SALT).unsign(ticket, max_age=STREAM_TICKET_SECONDS))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def fetch_events(cursor, limit=FETCH_SIZE):
+    from .models import OrderEvent
+
+    events = []
+    for event in OrderEvent.objects.filter(id__gt=cursor).order_by('id')[:limit]:
+        data = event.to_dict()
+        data['_created_at'] = event.created_at
+        events.append(data)
+    return events
+
+
+def latest_cursor():
+    from .models import OrderEvent
+
+    return OrderEvent.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+class OrderEventBroker:
+    """Per-process fan-out of the order change log.
+
+    A single thread polls OrderEvent for new rows and keeps the most recent
+    ones in memory, so any number of idle subscribers costs one query per
+    poll interval. Async subscribers wait on futures that the poller resolves
+    through their own event loop.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL, buffer_size=BUFFER_SIZE):
+        self.poll_interval = poll_interval
+        self.buffer = deque(maxlen=buffer_size)
+        self.floor = None
+        self.head = None
+        self.lock = threading.Lock()
+        self.waiters = set()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.head = self.floor = latest_cursor()
+            self.thread = threading.Thread(target=self._run, name='order-event-broker', daemon=True)
+            self.thread.start()
+
+    def wake(self):
+        self.wakeup.set()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+            close_old_connections()
+            try:
+                events = self._poll()
+            except Exception:
+                time.sleep(self.poll_interval)
+                continue
+            if events:
+                self._publish(events)
+
+    def _poll(self):
+        events = []
+        expected = self.head + 1
+        now = timezone.now()
+        for event in fetch_events(self.head):
+            # Ids are allocated at insert but may commit out of order; hold back
+            # anything behind a recent gap until the missing row shows up.
+            if event['id'] != expected and now - event['_created_at'] < GAP_GRACE:
+                break
+            events.append(event)
+            expected = event['id'] + 1
+        return events
+
+    def _publish(self, events):
+        with self.lock:
+            for event in events:
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.floor = self.buffer[0]['id']
+                self.buffer.append(event)
+            self.head = events[-1]['id']
+            waiters, self.waiters = self.waiters, set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def since(self, cursor):
+        """Buffered events after cursor, or None when the buffer no longer reaches back that far"""
+        with self.lock:
+            if cursor < self.floor:
+                return None
+            return [_public(event) for event in self.buffer if event['id'] > cursor]
+
+    async def wait(self, cursor, timeout):
+        """Return events after cursor, waiting up to timeout seconds for new ones"""
+        from asgiref.sync import sync_to_async
+
+        if self.thread is None or not self.thread.is_alive():
+            await sync_to_async(self.start)()
+
+        events = self.since(cursor)
+        if events is None:
+            return [_public(event) for event in await sync_to_async(fetch_events)(cursor)]
+        if events:
+            return events
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self.lock:
+            if self.head > cursor:
+                future.set_result(None)
+            else:
+                self.waiters.add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return []
+        finally:
+            with self.lock:
+                self.waiters.discard(waiter)
+        return self.since(cursor) or []
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _public(event):
+    return {key: value for key, value in event.items() if not key.startswith('_')}
+
+
+broker = OrderEventBroker()
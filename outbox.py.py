@@ -0,0 +1,137 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+# Retry delay doubles per failed attempt, up to this
+MAX_RETRY_DELAY = timedelta(minutes=10)
+
+_handlers = {}
+
+
+def handler(topic):
+    """Register the decorated function as the handler for topic.
+
+    Handlers receive the event payload as keyword arguments. Events are
+    delivered at least once, so a handler must be safe to run again.
+    """
+    def register(func):
+        _handlers[topic] = func
+        return func
+    return register
+
+
+def enqueue(topic, **payload):
+    """Record a side effect in the current transaction for run_outbox_worker to carry out.
+
+    The event commits or rolls back with the write that caused it, so it is
+    never lost to a crash after commit and never runs for a write that failed.
+    """
+    from .models import OutboxEvent
+
+    if topic not in _handlers:
+        raise ValueError(f'No outbox handler for {topic!r}.')
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def enqueue_many(topic, payloads):
+    """enqueue() for many payloads with one INSERT"""
+    from .models import OutboxEvent
+
+    if topic not in _handlers:
+        raise ValueError(f'No outbox handler for {topic!r}.')
+    return OutboxEvent.objects.bulk_create([OutboxEvent(topic=topic, payload=payload) for payload in payloads])
+
+
+def _retry_delay(attempts):
+    return min(timedelta(seconds=2 ** attempts), MAX_RETRY_DELAY)
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """Run up to batch_size due events; returns (succeeded, failed).
+
+    The batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED where the
+    database has it, so several workers can drain the table side by side.
+    Identical events in a batch run once. A failing handler is rolled back
+    to its savepoint and retried later with backoff; after OUTBOX_MAX_ATTEMPTS
+    the event is kept as failed for inspection in the admin.
+    """
+    from .models import OutboxEvent
+
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', MAX_ATTEMPTS)
+    skip_locked = connections[OutboxEvent.objects.db].features.has_select_for_update_skip_locked
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=skip_locked)
+            .filter(status='pending', available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        groups = {}
+        for event in events:
+            groups.setdefault((event.topic, json.dumps(event.payload, sort_keys=True)), []).append(event)
+
+        done, failed = [], []
+        for (topic, _), group in groups.items():
+            try:
+                with transaction.atomic():
+                    _handlers[topic](**group[0].payload)
+            except Exception as exc:
+                error = f'{type(exc).__name__}: {exc}'
+                for event in group:
+                    event.attempts += 1
+                    event.last_error = error
+                    event.available_at = now + _retry_delay(event.attempts)
+                    if event.attempts >= max_attempts:
+                        event.status = 'failed'
+                failed.extend(group)
+            else:
+                done.extend(event.pk for event in group)
+
+        OutboxEvent.objects.filter(pk__in=done).delete()
+        OutboxEvent.objects.bulk_update(failed, ['attempts', 'last_error', 'available_at', 'status'])
+    return len(done), len(failed)
+
+
+@handler('order.recalculate_total')
+def recalculate_order_total(order_id):
+    """Set an order's total to the sum of its items with one UPDATE"""
+    from .models import Order, OrderItem
+
+    item_total = (
+        OrderItem.objects.filter(order=OuterRef('pk')).order_by()
+        .values('order').annotate(total=Sum('price')).values('total')
+    )
+    Order.objects.filter(pk=order_id).update(
+        total=Coalesce(Subquery(item_total), Decimal('0')),
+        updated_at=timezone.now(),
+    )
+    user_id = Order.objects.filter(pk=order_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        refresh_stats(user_id)
+
+
+@handler('menu.renditions')
+def build_menu_renditions(image_name):
+    """Pre-build every rendition of a new upload; skipped if the upload is gone"""
+    from django.core.files.storage import default_storage
+
+    from . import renditions
+
+    if default_storage.exists(image_name):
+        renditions.generate_all(image_name)
+
+
+@handler('user.stats')
+def refresh_stats(user_id):
+    """Recompute a customer's activity counters after a booking or order write"""
+    from .user_stats import refresh_user_stats
+
+    refresh_user_stats(user_id)
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.db import close_old_connections
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 at settings.PASSWORD_HASH_ITERATIONS rounds.
+
+    It keeps the pbkdf2_sha256 algorithm name, so existing hashes verify
+    with it, and must_update() reports any hash made with another count,
+    which is what triggers the rehash at login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class HashingBusy(Exception):
+    """Every hashing worker is busy and the wait queue is full"""
+
+
+class _HashPool:
+    def __init__(self, workers, queue):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # Running plus waiting jobs; beyond that callers are turned away instead of piling up
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+
+@lru_cache(maxsize=None)
+def _pool(workers, queue):
+    return _HashPool(workers, queue)
+
+
+def _pooled(func, *args):
+    # Pool threads outlive requests, so they get the connection upkeep (CONN_MAX_AGE,
+    # dropped connections) the request cycle gives the sync thread; authenticate() queries
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_hashing(func, *args):
+    """Run a password hashing function off the event loop, in the bounded hashing pool.
+
+    With PASSWORD_HASH_WORKERS = 0 it runs on the shared sync thread like
+    any ORM call, which is how hashing behaved before the pool existed.
+    Raises HashingBusy when PASSWORD_HASH_QUEUE jobs are already waiting.
+    """
+    workers = getattr(settings, 'PASSWORD_HASH_WORKERS', 1)
+    if workers <= 0:
+        return await sync_to_async(func)(*args)
+    pool = _pool(workers, getattr(settings, 'PASSWORD_HASH_QUEUE', 32))
+    if not pool.slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        # PBKDF2 releases the GIL, so the pool hashes in parallel with request handling
+        return await asyncio.get_running_loop().run_in_executor(pool.executor, _pooled, func, *args)
+    finally:
+        pool.slots.release()
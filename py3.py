@@ -1,7 +1,17 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
-from .models import Category, MenuItem, Table, Booking, Order, OrderItem
+from django.urls import reverse
+from django.db import transaction
+from django.utils import timezone
+from .models import (
+    Category, MenuItem, Table, Booking, WaitlistEntry, Order, OrderItem,
+    ArchivedBooking, ArchivedOrder, ArchivedOrderItem, UserStats
+)
+from . import renditions
+from .allocation import find_best_table
+from .sparse_fields import SparseFieldsMixin
+from .expansion import ExpandableFieldsMixin
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,6 +19,11 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'is_staff']
         read_only_fields = ['is_staff']
 
+class UserStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserStats
+        fields = ['booking_count', 'order_count', 'lifetime_spend', 'last_visit', 'updated_at']
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True)
@@ -24,36 +39,91 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data.pop('password2')
-        user = User.objects.create_user(**validated_data)
+        # The register view hashes off the request thread and passes the hash in
+        password_hash = validated_data.pop('password_hash', None)
+        if password_hash is None:
+            return User.objects.create_user(**validated_data)
+        validated_data.pop('password')
+        user = User(
+            username=User.normalize_username(validated_data.pop('username')),
+            email=User.objects.normalize_email(validated_data.pop('email', '')),
+            password=password_hash,
+            **validated_data
+        )
+        user.save()
         return user
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     menu_items_count = serializers.IntegerField(source='menu_items.count', read_only=True)
     
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'menu_items_count', 'created_at']
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(SparseFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
+    image_renditions = serializers.SerializerMethodField()
+    
+    # Attributes the method fields read, for the values_list() list path
+    fast_method_sources = {'image_renditions': ['pk', 'image']}
     
     class Meta:
         model = MenuItem
         fields = [
             'id', 'name', 'price', 'category', 'category_name', 'description',
-            'image', 'is_available', 'created_at', 'updated_at'
+            'image', 'image_renditions', 'is_available', 'created_at', 'updated_at'
         ]
+    
+    def get_image_renditions(self, obj):
+        """URLs of the resized variants, e.g. image_renditions['thumb']['webp']"""
+        # obj.image is a FieldFile, or the stored name on the fast list path
+        image_name = str(obj.image or '')
+        if not image_name:
+            return None
+        request = self.context.get('request')
+        version = renditions.image_version(image_name)
+        urls = {}
+        for size in renditions.SIZES:
+            urls[size] = {}
+            for fmt in renditions.FORMATS:
+                url = reverse('menuitem-image', kwargs={'pk': obj.pk, 'size': size, 'fmt': fmt})
+                url = f'{url}?v={version}'
+                urls[size][fmt] = request.build_absolute_uri(url) if request else url
+        return urls
+
+class MenuItemBulkUpdateSerializer(serializers.Serializer):
+    """Select items by ids and/or category, then set price, percentage change and/or availability"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), required=False)
+    price = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=0, required=False)
+    percentage = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=-100, required=False)
+    is_available = serializers.BooleanField(required=False)
+    
+    def validate(self, data):
+        if 'ids' not in data and 'category' not in data:
+            raise serializers.ValidationError("Select menu items with ids and/or category.")
+        if 'price' in data and 'percentage' in data:
+            raise serializers.ValidationError("Give either price or percentage, not both.")
+        if not any(field in data for field in ['price', 'percentage', 'is_available']):
+            raise serializers.ValidationError("Nothing to update.")
+        return data
 
-class TableSerializer(serializers.ModelSerializer):
+class TableSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Table
         fields = ['id', 'number', 'capacity', 'location', 'is_available', 'created_at']
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
     table_number = serializers.IntegerField(source='table.number', read_only=True)
     table_capacity = serializers.IntegerField(source='table.capacity', read_only=True)
     user_name = serializers.CharField(source='user.username', read_only=True)
-    is_past_due = serializers.BooleanField(read_only=True)
+    is_past_due = serializers.SerializerMethodField()
+    
+    fast_method_sources = {'is_past_due': ['past_due']}
+    expandable_fields = {
+        'table': (TableSerializer, {}),
+        'user': (UserSerializer, {}),
+    }
     
     class Meta:
         model = Booking
@@ -64,8 +134,27 @@ class BookingSerializer(serializers.ModelSerializer):
             'is_past_due', 'created_at', 'updated_at'
         ]
         read_only_fields = ['user', 'status', 'is_past_due']
+        # Leave table out to have the smallest free table that fits assigned
+        extra_kwargs = {'table': {'required': False}}
+    
+    def get_is_past_due(self, obj):
+        # Querysets from Booking.objects.with_past_due() carry the flag computed in SQL
+        past_due = getattr(obj, 'past_due', None)
+        if past_due is None:
+            return obj.is_past_due()
+        return bool(past_due)
     
     def validate(self, data):
+        if self.instance is None and 'table' not in data:
+            table = find_best_table(data['date'], data['time_slot'], data['number_of_guests'])
+            if table is None:
+                raise serializers.ValidationError(
+                    f"No table for {data['number_of_guests']} guests is free at the selected date and time."
+                )
+            data['table'] = table
+            data['table_auto_assigned'] = True
+            return data
+        
         # Check if table is available for the selected date and time
         if self.instance is None:  # Only for create, not update
             table = data['table']
@@ -84,18 +173,43 @@ class BookingSerializer(serializers.ModelSerializer):
                     "This table is already booked for the selected date and time."
                 )
         
-        # Check if number of guests exceeds table capacity
-        if data['number_of_guests'] > data['table'].capacity:
+        # Check if number of guests exceeds table capacity; an update may leave either out
+        table = data.get('table', getattr(self.instance, 'table', None))
+        number_of_guests = data.get('number_of_guests', getattr(self.instance, 'number_of_guests', None))
+        if number_of_guests > table.capacity:
             raise serializers.ValidationError(
-                f"Number of guests exceeds table capacity. Maximum is {data['table'].capacity}."
+                f"Number of guests exceeds table capacity. Maximum is {table.capacity}."
             )
         
         return data
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WaitlistEntry
+        fields = [
+            'id', 'user', 'date', 'time_slot', 'number_of_guests', 'customer_name',
+            'customer_email', 'customer_phone', 'special_requests', 'status',
+            'booking', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['user', 'status', 'booking']
+    
+    def validate(self, data):
+        if data['date'] < timezone.localdate():
+            raise serializers.ValidationError("Cannot join the waitlist for a past date.")
+        if find_best_table(data['date'], data['time_slot'], data['number_of_guests']) is not None:
+            raise serializers.ValidationError(
+                "A table is available for the selected date and time; book it directly."
+            )
+        return data
+
+class OrderItemSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     menu_item_name = serializers.CharField(source='menu_item.name', read_only=True)
     menu_item_price = serializers.DecimalField(source='menu_item.price', read_only=True, max_digits=6, decimal_places=2)
     
+    expandable_fields = {
+        'menu_item': (MenuItemSerializer, {}),
+    }
+    
     class Meta:
         model = OrderItem
         fields = [
@@ -103,11 +217,17 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'quantity', 'unit_price', 'price'
         ]
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user_name = serializers.CharField(source='user.username', read_only=True)
     booking_info = serializers.CharField(source='booking.__str__', read_only=True)
     
+    expandable_fields = {
+        'items': (OrderItemSerializer, {'many': True}),
+        'booking': (BookingSerializer, {}),
+        'user': (UserSerializer, {}),
+    }
+    
     class Meta:
         model = Order
         fields = [
@@ -124,10 +244,69 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         fields = ['booking', 'special_instructions', 'items']
     
     def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
+        items = [OrderItem(**item_data) for item_data in validated_data.pop('items')]
+        for item in items:
+            item.set_price()
         
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
+        # The prices are known here, so the order is written with its total
+        # and the items in one INSERT, with no recalculation per item
+        with transaction.atomic():
+            order = Order.objects.create(total=sum(item.price for item in items), **validated_data)
+            for item in items:
+                item.order = order
+            OrderItem.objects.bulk_create(items)
         
-        return order
\ No newline at end of file
+        return order
+
+class OrderStatusChangeSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    """Either {"ids": [...], "status": "..."} or {"orders": [{"id": ..., "status": "..."}, ...]}"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
+    orders = OrderStatusChangeSerializer(many=True, required=False)
+    
+    MAX_ORDERS = 500
+    
+    def validate(self, data):
+        if data.get('ids') and 'status' not in data:
+            raise serializers.ValidationError({"status": "A target status is required with ids."})
+        changes = {order_id: data['status'] for order_id in data.get('ids', [])}
+        for change in data.get('orders', []):
+            changes[change['id']] = change['status']
+        if not changes:
+            raise serializers.ValidationError("Provide ids and status, or a list of orders.")
+        if len(changes) > self.MAX_ORDERS:
+            raise serializers.ValidationError(f"At most {self.MAX_ORDERS} orders can be updated at once.")
+        data['changes'] = changes
+        return data
+
+class ArchivedBookingSerializer(serializers.ModelSerializer):
+    table_number = serializers.IntegerField(source='table.number', read_only=True)
+    
+    class Meta:
+        model = ArchivedBooking
+        fields = [
+            'id', 'user', 'table', 'table_number', 'date', 'time_slot', 'number_of_guests',
+            'customer_name', 'customer_email', 'customer_phone', 'special_requests',
+            'status', 'created_at', 'updated_at', 'archived_at'
+        ]
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    menu_item_name = serializers.CharField(source='menu_item.name', read_only=True)
+    
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ['id', 'menu_item', 'menu_item_name', 'quantity', 'unit_price', 'price']
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            'id', 'user', 'booking_id', 'status', 'total', 'special_instructions',
+            'items', 'created_at', 'updated_at', 'archived_at'
+        ]
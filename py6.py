@@ -1,5 +1,9 @@
-from django.contrib import admin
-from .models import Category, MenuItem, Table, Booking, Order, OrderItem
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.utils import timezone
+from .models import Category, MenuItem, Table, Booking, WaitlistEntry, Order, OrderItem, UserStats, OutboxEvent, SlowQuery
+from .admin_mixins import ScalableAdminMixin
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -11,12 +15,55 @@ class CategoryAdmin(admin.ModelAdmin):
         return obj.menu_items.count()
     menu_items_count.short_description = 'Menu Items'
 
+class MenuItemActionForm(ActionForm):
+    price = forms.DecimalField(max_digits=6, decimal_places=2, min_value=0, required=False)
+    percentage = forms.DecimalField(max_digits=5, decimal_places=2, min_value=-100, required=False,
+                                    help_text='e.g. 10 or -15')
+
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
     list_display = ['name', 'price', 'category', 'is_available', 'created_at']
     list_filter = ['category', 'is_available', 'created_at']
     search_fields = ['name', 'description']
     list_editable = ['price', 'is_available']
+    action_form = MenuItemActionForm
+    actions = ['make_available', 'make_unavailable', 'set_price', 'adjust_price']
+    
+    def _apply(self, request, queryset, **changes):
+        try:
+            updated = queryset.apply_changes(**changes)
+        except ValueError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        self.message_user(request, f'Updated {updated} menu items.', messages.SUCCESS)
+    
+    def _action_value(self, request, field):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid() or form.cleaned_data.get(field) is None:
+            self.message_user(request, f'Enter a valid {field} first.', messages.ERROR)
+            return None
+        return form.cleaned_data[field]
+    
+    @admin.action(description='Mark selected items available')
+    def make_available(self, request, queryset):
+        self._apply(request, queryset, is_available=True)
+    
+    @admin.action(description='Mark selected items unavailable')
+    def make_unavailable(self, request, queryset):
+        self._apply(request, queryset, is_available=False)
+    
+    @admin.action(description='Set price of selected items')
+    def set_price(self, request, queryset):
+        price = self._action_value(request, 'price')
+        if price is not None:
+            self._apply(request, queryset, price=price)
+    
+    @admin.action(description='Change price of selected items by percentage')
+    def adjust_price(self, request, queryset):
+        percentage = self._action_value(request, 'percentage')
+        if percentage is not None:
+            self._apply(request, queryset, percentage=percentage)
 
 @admin.register(Table)
 class TableAdmin(admin.ModelAdmin):
@@ -25,22 +72,55 @@ class TableAdmin(admin.ModelAdmin):
     list_editable = ['is_available']
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'customer_name', 'date', 'time_slot', 'table', 'number_of_guests', 'status', 'created_at']
     list_filter = ['status', 'date', 'time_slot', 'created_at']
     search_fields = ['customer_name', 'customer_email', 'customer_phone']
     list_editable = ['status']
     readonly_fields = ['created_at', 'updated_at']
+    date_hierarchy = 'date'
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'customer_name', 'date', 'time_slot', 'number_of_guests', 'status', 'booking', 'created_at']
+    list_filter = ['status', 'date', 'time_slot']
+    search_fields = ['customer_name', 'customer_email', 'customer_phone']
+    readonly_fields = ['booking', 'created_at', 'updated_at']
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'user', 'status', 'total', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['user__username', 'booking__customer_name']
     readonly_fields = ['created_at', 'updated_at']
+    date_hierarchy = 'created_at'
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ['order', 'menu_item', 'quantity', 'unit_price', 'price']
     list_filter = ['order__status']
-    search_fields = ['order__id', 'menu_item__name']
\ No newline at end of file
+    search_fields = ['order__id', 'menu_item__name']
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'booking_count', 'order_count', 'lifetime_spend', 'last_visit', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = [f.name for f in UserStats._meta.fields]
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'status', 'attempts', 'available_at', 'created_at']
+    list_filter = ['status', 'topic']
+    readonly_fields = [f.name for f in OutboxEvent._meta.fields]
+    actions = ['retry']
+    
+    @admin.action(description='Retry selected events now')
+    def retry(self, request, queryset):
+        updated = queryset.update(status='pending', attempts=0, available_at=timezone.now())
+        self.message_user(request, f'Queued {updated} outbox events for retry.', messages.SUCCESS)
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['fingerprint', 'view_name', 'count', 'total_ms', 'max_ms', 'last_seen']
+    search_fields = ['normalized_sql', 'view_name']
+    readonly_fields = [f.name for f in SlowQuery._meta.fields]
\ No newline at end of file
@@ -0,0 +1,73 @@
+import datetime
+import decimal
+import uuid
+
+from django.db.models import QuerySet
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _default(obj):
+    """Types orjson/msgpack do not encode on their own, converted as DRF's JSONEncoder does"""
+    if isinstance(obj, decimal.Decimal):
+        # Serializers coerce decimals to strings already; this covers raw values
+        return float(obj)
+    if isinstance(obj, datetime.datetime):
+        representation = obj.isoformat()
+        if representation.endswith('+00:00'):
+            representation = representation[:-6] + 'Z'
+        return representation
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, (uuid.UUID, Promise)):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple, QuerySet)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not serializable')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson; falls back to the stdlib encoder when it is not installed"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as e:
+            raise ParseError(f'MessagePack parse error - {e}')
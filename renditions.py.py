@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import os
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Longest edge in pixels; 'thumb' covers 80px list thumbnails at 2x density
+SIZES = {
+    'thumb': 160,
+    'small': 320,
+    'medium': 640,
+}
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+RENDITIONS_DIR = 'renditions'
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+def rendition_name(image_name, size, fmt):
+    """Storage name of a rendition, in a renditions/ folder beside the original.
+
+    The original's full filename is kept, extension included, so photo.png
+    and photo.jpg in one folder never share renditions.
+    """
+    directory, filename = posixpath.split(image_name)
+    return posixpath.join(directory, RENDITIONS_DIR, f'{filename}__{size}.{fmt}')
+
+
+def image_version(image_name):
+    """Short token that changes whenever a new original is uploaded"""
+    return hashlib.md5(image_name.encode('utf-8')).hexdigest()[:8]
+
+
+def generate(image_name, size, fmt):
+    """Create one rendition if it does not exist yet and return its storage name"""
+    from PIL import Image, ImageOps
+
+    name = rendition_name(image_name, size, fmt)
+    if default_storage.exists(name):
+        return name
+
+    pil_format, options = FORMATS[fmt]
+    with default_storage.open(image_name, 'rb') as original:
+        with Image.open(original) as image:
+            image = ImageOps.exif_transpose(image)
+            if pil_format == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            image.thumbnail((SIZES[size], SIZES[size]), Image.LANCZOS)
+            output = BytesIO()
+            image.save(output, pil_format, **options)
+
+    # Two workers racing on the same rendition produce identical files; keep the first
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(output.getvalue()))
+
+
+def try_generate(image_name, size, fmt):
+    """generate(), or None with the error logged when the original is missing or not a readable image"""
+    from PIL import Image
+
+    try:
+        return generate(image_name, size, fmt)
+    # OSError covers a missing file and PIL's UnidentifiedImageError and truncated images
+    except (OSError, Image.DecompressionBombError):
+        logger.warning('Cannot build the %s %s rendition of %s', size, fmt, image_name, exc_info=True)
+        return None
+
+
+def generate_all(image_name):
+    for size in SIZES:
+        for fmt in FORMATS:
+            # A broken upload will not get better on retry
+            if try_generate(image_name, size, fmt) is None:
+                return
+    evict()
+
+
+def touch(name):
+    """Mark a rendition as recently used for eviction"""
+    try:
+        os.utime(default_storage.path(name))
+    except (NotImplementedError, OSError):
+        pass
+
+
+def evict(max_bytes=None):
+    """Delete least recently used renditions until the cache fits in max_bytes.
+
+    Only applies to filesystem storage; originals are never touched.
+    """
+    from .models import MenuItem
+
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'MENU_IMAGE_RENDITION_CACHE_BYTES', DEFAULT_CACHE_BYTES)
+    upload_to = MenuItem._meta.get_field('image').upload_to
+    try:
+        root = default_storage.path(posixpath.join(upload_to, RENDITIONS_DIR))
+    except NotImplementedError:
+        return 0
+
+    try:
+        entries = [(entry.path, entry.stat()) for entry in os.scandir(root) if entry.is_file()]
+    except FileNotFoundError:
+        return 0
+
+    total = sum(stat.st_size for _, stat in entries)
+    if total <= max_bytes:
+        return 0
+
+    # Trim to 90% of the budget so eviction does not run on every new rendition
+    target = max_bytes * 0.9
+    removed = 0
+    for path, stat in sorted(entries, key=lambda entry: entry[1].st_mtime):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= stat.st_size
+        removed += 1
+    return removed
@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractIsoWeekDay
+from django.utils import timezone
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+OCCUPANCY_CACHE_PREFIX = 'restaurant:occupancy'
+
+
+def _weekday_counts(start, end):
+    """How many times each ISO weekday (Monday first) occurs in [start, end]"""
+    import numpy as np
+
+    days = (end - start).days + 1
+    counts = np.full(7, days // 7, dtype=np.int64)
+    first = start.isoweekday() - 1
+    counts[(first + np.arange(days % 7)) % 7] += 1
+    return counts
+
+
+def _ratio(used, offered):
+    import numpy as np
+
+    ratio = np.divide(used, offered, out=np.zeros(used.shape), where=offered > 0)
+    return np.round(ratio, 4).tolist()
+
+
+def _matrix(used, offered):
+    """Utilization per (weekday, time slot) plus the weekday, slot and overall marginals"""
+    return {
+        'matrix': _ratio(used, offered),
+        'by_weekday': _ratio(used.sum(axis=1), offered.sum(axis=1)),
+        'by_time_slot': _ratio(used.sum(axis=0), offered.sum(axis=0)),
+        'overall': _ratio(used.sum(), offered.sum()),
+        'seats_booked': int(used.sum()),
+        'seats_offered': int(offered.sum()),
+    }
+
+
+def build_occupancy_report(start, end):
+    """Seat utilization per table, location, weekday and time slot between start and end.
+
+    One grouped query sums booked seats per (table, weekday, slot); the seats
+    offered are each table's capacity times the number of times the weekday
+    falls in the range, so the ratios come out of a few array operations
+    whatever the size of the range.
+    """
+    # Imported here so processes that never build the report do not load NumPy
+    import numpy as np
+
+    from .models import Booking, Table
+
+    slots = [slot for slot, _ in Booking.TIME_SLOTS]
+    tables = list(Table.objects.order_by('number').values_list('id', 'number', 'location', 'capacity'))
+    table_index = {table_id: index for index, (table_id, *_) in enumerate(tables)}
+    slot_index = {slot: index for index, slot in enumerate(slots)}
+
+    rows = list(
+        Booking.objects.filter(date__range=(start, end), active=True)
+        .annotate(weekday=ExtractIsoWeekDay('date'))
+        .values_list('table_id', 'weekday', 'time_slot')
+        .annotate(seats=Sum('number_of_guests'), bookings=Count('id'))
+        # Meta.ordering would otherwise be added to the GROUP BY
+        .order_by()
+    )
+    rows = [row for row in rows if row[0] in table_index and row[2] in slot_index]
+
+    seats = np.zeros((len(tables), 7, len(slots)), dtype=np.int64)
+    bookings = np.zeros_like(seats)
+    if rows:
+        table_ids, weekdays, time_slots, booked_seats, booking_counts = zip(*rows)
+        position = (
+            np.fromiter((table_index[table_id] for table_id in table_ids), dtype=np.intp, count=len(rows)),
+            np.asarray(weekdays, dtype=np.intp) - 1,
+            np.fromiter((slot_index[slot] for slot in time_slots), dtype=np.intp, count=len(rows)),
+        )
+        np.add.at(seats, position, np.asarray(booked_seats, dtype=np.int64))
+        np.add.at(bookings, position, np.asarray(booking_counts, dtype=np.int64))
+
+    capacities = np.array([capacity for *_, capacity in tables], dtype=np.int64)
+    days = _weekday_counts(start, end)
+    offered = np.broadcast_to(capacities[:, None, None] * days[None, :, None], seats.shape)
+    slots_offered = np.broadcast_to(days[None, :, None], seats.shape)
+
+    locations = sorted({location or '' for _, _, location, _ in tables})
+    location_of = np.array([locations.index(location or '') for _, _, location, _ in tables], dtype=np.intp)
+    location_seats = np.zeros((len(locations), 7, len(slots)), dtype=np.int64)
+    location_offered = np.zeros_like(location_seats)
+    np.add.at(location_seats, location_of, seats)
+    np.add.at(location_offered, location_of, offered)
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'weekdays': WEEKDAYS,
+        'time_slots': slots,
+        'overall': _matrix(seats.sum(axis=0), offered.sum(axis=0)),
+        'locations': [
+            {'location': location, **_matrix(location_seats[index], location_offered[index])}
+            for index, location in enumerate(locations)
+        ],
+        'tables': [
+            {
+                'table': number,
+                'location': location,
+                'capacity': capacity,
+                'bookings': int(bookings[index].sum()),
+                'slot_occupancy': _ratio(bookings[index].sum(), slots_offered[index].sum()),
+                **_matrix(seats[index], offered[index]),
+            }
+            for index, (_, number, location, capacity) in enumerate(tables)
+        ],
+    }
+
+
+def occupancy_report(start, end):
+    """Cached build_occupancy_report; ranges wholly in the past are kept longer"""
+    key = f'{OCCUPANCY_CACHE_PREFIX}:{start.isoformat()}:{end.isoformat()}'
+    report = cache.get(key)
+    if report is None:
+        report = build_occupancy_report(start, end)
+        timeout = getattr(settings, 'OCCUPANCY_REPORT_CACHE_SECONDS', 600)
+        if end < timezone.localdate() - timedelta(days=1):
+            timeout = max(timeout, 24 * 60 * 60)
+        cache.set(key, report, timeout)
+    return report
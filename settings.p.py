@@ -2,6 +2,8 @@
 Django settings for littlelemon project.
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,8 +41,19 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'restaurant.slow_queries.SlowQueryMiddleware',
+    'restaurant.traffic.TrafficRecorderMiddleware',
 ]
 
+# Queries slower than this (in milliseconds) are recorded with their EXPLAIN plan.
+# Set to None to disable. Inspect with: python manage.py slow_queries
+SLOW_QUERY_THRESHOLD_MS = 100
+
+# Set TRAFFIC_LOG_PATH to append a sanitized line per API request (no headers, tokens,
+# passwords or customer details) for load tests with: python manage.py replay_traffic
+TRAFFIC_LOG_PATH = os.environ.get('TRAFFIC_LOG_PATH')
+TRAFFIC_LOG_SAMPLE_RATE = 1.0
+
 ROOT_URLCONF = 'littlelemon.urls'
 
 TEMPLATES = [
@@ -60,6 +73,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'littlelemon.wsgi.application'
+# Serve with an ASGI server (e.g. uvicorn littlelemon.asgi:application) so idle
+# order feed subscribers do not each hold a worker thread.
+ASGI_APPLICATION = 'littlelemon.asgi.application'
 
 # Database - MySQL
 DATABASES = {
@@ -85,13 +101,17 @@ DATABASES = {
 # }
 
 # Django REST Framework settings
+# JSON is rendered with orjson when installed; MessagePack is offered to clients
+# sending Accept/Content-Type: application/msgpack when msgpack is installed.
+HAS_MSGPACK = find_spec('msgpack') is not None
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-    ],
+        'restaurant.renderers.FastJSONRenderer',
+    ] + (['restaurant.renderers.MessagePackRenderer'] if HAS_MSGPACK else []),
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
-    ],
+    ] + (['restaurant.renderers.MessagePackParser'] if HAS_MSGPACK else []),
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
@@ -116,6 +136,37 @@ REST_FRAMEWORK = {
     }
 }
 
+# API-only deployment profile (DJANGO_PROFILE=api) for processes that serve the token
+# API: /api/ requests skip session, CSRF, auth, messages and clickjacking middleware
+# (the admin keeps them through SiteOnlyMiddleware), DRF authenticates by token only,
+# and staticfiles is not loaded (serve collected static files from the web server).
+# Compare the profiles with: python manage.py benchmark_startup
+API_ONLY = os.environ.get('DJANGO_PROFILE') == 'api'
+API_PATH_PREFIX = '/api/'
+
+if API_ONLY:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'django.contrib.staticfiles']
+    SITE_ONLY_MIDDLEWARE = [
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ]
+    MIDDLEWARE = [
+        'corsheaders.middleware.CorsMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'restaurant.middleware.SiteOnlyMiddleware',
+        'restaurant.slow_queries.SlowQueryMiddleware',
+        'restaurant.traffic.TrafficRecorderMiddleware',
+    ]
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = [
+        'rest_framework.authentication.TokenAuthentication',
+    ]
+    # The admin finds its session/auth/messages middleware inside SiteOnlyMiddleware
+    SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -124,6 +175,23 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 # Password validation
+# Passwords are PBKDF2-SHA256 at PASSWORD_HASH_ITERATIONS rounds; after changing the
+# count each user's password is rehashed at their next login.
+PASSWORD_HASHERS = [
+    'restaurant.passwords.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = 1_000_000
+
+# register/login hash in this many threads per process (0 hashes inline); at most
+# PASSWORD_HASH_QUEUE more wait, further requests get 503 with Retry-After. Keep
+# workers x processes below the CPU count so request handling keeps a core.
+PASSWORD_HASH_WORKERS = 1
+PASSWORD_HASH_QUEUE = 32
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -149,5 +217,31 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Uploaded files (menu images and their resized renditions)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Disk budget for menu image renditions; least recently used ones are evicted
+MENU_IMAGE_RENDITION_CACHE_BYTES = 512 * 1024 * 1024
+
+# Caching and request coalescing (restaurant.coalescing) use the default cache. With
+# several worker processes, point CACHES at a shared backend such as Redis or Memcached
+# so workers share results and coalescing locks; warm_caches fills it before a deploy
+# takes traffic.
+
+# Unfiltered menu, category and table list pages; dropped on change by version bumps,
+# so this only bounds how long a change made around the models (queryset.update) shows
+LIST_CACHE_SECONDS = 3600
+
+# Occupancy report cache lifetime; ranges wholly in the past are kept for a day
+OCCUPANCY_REPORT_CACHE_SECONDS = 600
+
+# Finished bookings and orders older than this move to the archive tables
+ARCHIVE_RETENTION_DAYS = 365
+
+# Transactional outbox: run_outbox_worker retries a failing event with
+# exponential backoff and gives up after this many attempts
+OUTBOX_MAX_ATTEMPTS = 8
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
@@ -0,0 +1,176 @@
+import hashlib
+import re
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+DEFAULT_THRESHOLD_MS = 100
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+# EXPLAIN output can show parameter values, so it is skipped on tables holding credentials
+_SENSITIVE_TABLES = re.compile(r'\b(?:authtoken_token|auth_user|django_session)\b')
+
+
+def normalize_sql(sql):
+    """Replace literals and placeholder lists so equivalent queries share a fingerprint"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def describe_params(params):
+    """Parameter types, never values: a token lookup or password update must not land in the table"""
+    if params is None:
+        return ''
+    if isinstance(params, dict):
+        return repr({key: type(value).__name__ for key, value in params.items()})
+    return repr(tuple(type(value).__name__ for value in params))
+
+
+def fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode('utf-8')).hexdigest()
+
+
+def explain(sql, params):
+    """Run the database's EXPLAIN for a SELECT, returning its output as text"""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    if _SENSITIVE_TABLES.search(sql):
+        return 'EXPLAIN skipped: the query reads credentials.'
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    return '\n'.join(' | '.join(str(col) for col in row) for row in rows)
+
+
+class QueryTimer:
+    """Execute wrapper that keeps every query slower than the threshold"""
+
+    def __init__(self, threshold_ms):
+        self.threshold_ms = threshold_ms
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= self.threshold_ms and not many:
+                self.slow.append((sql, params, duration_ms))
+
+
+_current_timer = ContextVar('slow_query_timer', default=None)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    """Execute wrapper on every connection; times the query if a request timer is active"""
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def _install_timer(sender, connection, **kwargs):
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+def record(view_name, sql, params, duration_ms):
+    """Add one slow execution to the aggregate row for its fingerprint"""
+    from .models import SlowQuery
+
+    normalized = normalize_sql(sql)
+    key = fingerprint(normalized)
+    updated = SlowQuery.objects.filter(fingerprint=key).update(
+        count=F('count') + 1,
+        total_ms=F('total_ms') + duration_ms,
+        max_ms=Greatest(F('max_ms'), duration_ms),
+        sample_params=describe_params(params),
+        view_name=view_name,
+    )
+    if not updated:
+        SlowQuery.objects.get_or_create(
+            fingerprint=key,
+            defaults={
+                'normalized_sql': normalized,
+                'sample_sql': sql,
+                'sample_params': describe_params(params),
+                'view_name': view_name,
+                'explain': explain(sql, params),
+                'count': 1,
+                'total_ms': duration_ms,
+                'max_ms': duration_ms,
+            }
+        )
+
+
+class SlowQueryMiddleware:
+    """Time every ORM query in a request and record the slow ones by fingerprint.
+
+    Works in sync and async stacks. Database connections are per thread and
+    an async request's queries run in sync_to_async threads, so the
+    request's timer travels in a context variable that asgiref copies into
+    those threads, and every connection runs the queries through it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', DEFAULT_THRESHOLD_MS)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.threshold_ms is None:
+            return self.get_response(request)
+
+        timer = QueryTimer(self.threshold_ms)
+        token = _current_timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        self._record(request, timer)
+        return response
+
+    async def __acall__(self, request):
+        if self.threshold_ms is None:
+            return await self.get_response(request)
+
+        timer = QueryTimer(self.threshold_ms)
+        token = _current_timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        if timer.slow:
+            await sync_to_async(self._record)(request, timer)
+        return response
+
+    def _record(self, request, timer):
+        if timer.slow:
+            match = request.resolver_match
+            view_name = match.view_name if match else request.path
+            for sql, params, duration_ms in timer.slow:
+                record(view_name, sql, params, duration_ms)
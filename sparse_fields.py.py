@@ -0,0 +1,103 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def requested_fields(request):
+    """Field names from ?fields=a,b,c, or None when the parameter is absent"""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get(FIELDS_PARAM) if hasattr(request, 'query_params') else None
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """Serializer mixin that keeps only the fields named in ?fields= on read requests"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get('request'))
+        if wanted:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+def _resolve(model, source):
+    """Return (only() path, select_related path or None) for a dotted source, or None if it is not a column"""
+    parts = source.split('.')
+    joins = []
+    for index, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        last = index == len(parts) - 1
+        if last:
+            if not field.concrete or field.many_to_many:
+                return None
+            return '__'.join(parts), '__'.join(joins) or None
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            return None
+        joins.append(part)
+        model = field.related_model
+
+
+def narrowing(serializer):
+    """(columns, joins) a queryset needs for this serializer's fields, or None if it cannot tell"""
+    model = serializer.Meta.model
+    method_sources = getattr(serializer, 'fast_method_sources', {})
+    columns, joins = set(), set()
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in method_sources:
+                return None
+            for attr in method_sources[name]:
+                resolved = _resolve(model, attr)
+                # Anything else (pk, annotations) is always on the row
+                if resolved:
+                    columns.add(resolved[0])
+            continue
+        if isinstance(field, serializers.BaseSerializer):
+            # Nested reverse relations are loaded separately and need no column here
+            try:
+                relation = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if relation.concrete:
+                return None
+            continue
+        if field.source == '*':
+            return None
+        resolved = _resolve(model, field.source)
+        if resolved is None:
+            return None
+        column, join = resolved
+        columns.add(column)
+        if join:
+            joins.add(join)
+    return columns, joins
+
+
+class SparseFieldsViewSetMixin:
+    """Push ?fields= down into .only() so unused columns and joins are not fetched"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if requested_fields(self.request) is None:
+            return queryset
+        narrowed = narrowing(self.get_serializer())
+        if narrowed is None:
+            return queryset
+        columns, joins = narrowed
+        queryset = queryset.select_related(None)
+        if joins:
+            # select_related() without arguments would follow every foreign key
+            queryset = queryset.select_related(*joins)
+        return queryset.only(*(columns or ['pk']))
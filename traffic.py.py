@@ -0,0 +1,147 @@
+import json
+import random
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+# Recorded values of these fields are replaced, so a log holds no credentials or
+# personal data; the replacements still pass validation when replayed
+SANITIZED_FIELDS = {
+    'password': 'replay-password',
+    'password2': 'replay-password',
+    'token': '',
+    'ticket': '',
+    'username': 'replay-guest',
+    'email': 'replay@example.com',
+    'customer_email': 'replay@example.com',
+    'first_name': 'Replay',
+    'last_name': 'Guest',
+    'customer_name': 'Replay Guest',
+    'customer_phone': '0000000000',
+    'special_requests': '',
+    'special_instructions': '',
+    # Free-text ?search= matches guest names, emails and phone numbers
+    'search': 'replay',
+}
+# Request bodies larger than this are recorded without their body
+MAX_BODY_BYTES = 64 * 1024
+
+_ROUTE_PARAMETER = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+
+
+def sanitize(data):
+    """Copy of parsed JSON or query data with every SANITIZED_FIELDS value replaced"""
+    if isinstance(data, dict):
+        return {
+            key: SANITIZED_FIELDS[key] if key in SANITIZED_FIELDS else sanitize(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [sanitize(value) for value in data]
+    return data
+
+
+def route_of(request):
+    """URL pattern the request resolved to, e.g. 'api/bookings/<pk>/', or None"""
+    match = request.resolver_match
+    if match is None:
+        return None
+    route = _ROUTE_PARAMETER.sub(r'<\1>', match.route)
+    return route.replace('^', '').replace('$', '').replace('\\', '')
+
+
+def read_log(path):
+    """Recorded requests from a traffic log, oldest first"""
+    with open(path, encoding='utf-8') as log:
+        records = [json.loads(line) for line in log if line.strip()]
+    return sorted(records, key=lambda record: record['t'])
+
+
+class TrafficRecorderMiddleware:
+    """Append a sanitized line per API request to TRAFFIC_LOG_PATH for replay_traffic.
+
+    Each line holds the time, method, route, path, query parameters and JSON
+    body (both sanitized), kind of user, status and server time in milliseconds;
+    never headers, cookies or tokens. Only a TRAFFIC_LOG_SAMPLE_RATE share
+    of requests is written. Streaming responses (the order feed) are not
+    recorded. Unused unless TRAFFIC_LOG_PATH is set.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        path = getattr(settings, 'TRAFFIC_LOG_PATH', None)
+        if not path:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.prefix = getattr(settings, 'API_PATH_PREFIX', '/api/')
+        self.sample_rate = getattr(settings, 'TRAFFIC_LOG_SAMPLE_RATE', 1.0)
+        # Line buffered, so each record reaches the file whole
+        self.log = open(path, 'a', buffering=1, encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def _sampled(self, request):
+        return request.path_info.startswith(self.prefix) and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled(request):
+            return self.get_response(request)
+        body = self._body(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._write(request, response, body, start)
+        return response
+
+    async def __acall__(self, request):
+        if not self._sampled(request):
+            return await self.get_response(request)
+        body = self._body(request)
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._write(request, response, body, start)
+        return response
+
+    def _body(self, request):
+        # Read before the view so DRF parses from the buffered copy
+        if request.content_type != 'application/json':
+            return None
+        if int(request.META.get('CONTENT_LENGTH') or 0) > MAX_BODY_BYTES:
+            return None
+        try:
+            return sanitize(json.loads(request.body or 'null'))
+        except ValueError:
+            return None
+
+    def _write(self, request, response, body, start):
+        if response.streaming:
+            return
+        duration_ms = (time.perf_counter() - start) * 1000
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            kind = 'anonymous'
+        else:
+            kind = 'staff' if user.is_staff else 'user'
+        record = {
+            # When the request arrived; replays keep the gaps between requests
+            't': round(time.time() - duration_ms / 1000, 3),
+            'method': request.method,
+            'route': route_of(request),
+            'path': request.path,
+            'query': sanitize({key: request.GET.getlist(key) for key in request.GET}),
+            'body': body,
+            'user': kind,
+            'status': response.status_code,
+            'ms': round(duration_ms, 2),
+        }
+        line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+        with self.lock:
+            self.log.write(line)
@@ -7,9 +7,17 @@ router.register(r'categories', views.CategoryViewSet)
 router.register(r'menu-items', views.MenuItemViewSet)
 router.register(r'tables', views.TableViewSet)
 router.register(r'bookings', views.BookingViewSet, basename='booking')
+router.register(r'waitlist', views.WaitlistEntryViewSet, basename='waitlist')
 router.register(r'orders', views.OrderViewSet, basename='order')
+router.register(r'archive/bookings', views.ArchivedBookingViewSet, basename='archived-booking')
+router.register(r'archive/orders', views.ArchivedOrderViewSet, basename='archived-order')
 
 urlpatterns = [
+    # Kitchen order feed (before the router so 'orders/<pk>/' does not capture them)
+    path('orders/stream/', views.order_event_stream, name='order-stream'),
+    path('orders/stream/ticket/', views.order_stream_ticket, name='order-stream-ticket'),
+    path('orders/changes/', views.order_event_poll, name='order-changes'),
+    
     path('', include(router.urls)),
     
     # Authentication
@@ -21,4 +29,5 @@ urlpatterns = [
     # Additional endpoints
     path('bookings/available-slots/', views.BookingViewSet.as_view({'get': 'available_slots'}), name='available-slots'),
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('reports/occupancy/', views.occupancy_heatmap, name='occupancy-heatmap'),
 ]
\ No newline at end of file
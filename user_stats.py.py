@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db.models import Count, Max, Q, Sum
+
+BATCH_SIZE = 1000
+STAT_FIELDS = ['booking_count', 'order_count', 'lifetime_spend', 'last_visit']
+
+_paused = ContextVar('user_stats_paused', default=False)
+
+
+@contextmanager
+def unchanged():
+    """Skip the per-delete refresh inside the block, for deletes that leave every counter as it was"""
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+def refresh_paused():
+    return _paused.get()
+
+
+def _grouped(querysets, user_ids, **aggregates):
+    """user id -> aggregate values, combined across the hot and archive querysets"""
+    results = {}
+    for queryset in querysets:
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=user_ids)
+        for row in queryset.order_by().values('user_id').annotate(**aggregates):
+            merged = results.setdefault(row['user_id'], {})
+            for name in aggregates:
+                value, current = row[name], merged.get(name)
+                if current is None:
+                    merged[name] = value
+                elif value is not None:
+                    merged[name] = max(current, value) if isinstance(aggregates[name], Max) else current + value
+    return results
+
+
+def compute_stats(user_ids=None):
+    """user id -> stat values for the given users (all when None), from four grouped queries.
+
+    Archived bookings and orders count too: archiving moves rows, it does
+    not end a customer's history. Cancelled bookings and orders do not count.
+    """
+    from .models import ArchivedBooking, ArchivedOrder, Booking, Order
+
+    bookings = _grouped(
+        [Booking.objects.all(), ArchivedBooking.objects.all()], user_ids,
+        booking_count=Count('id', filter=~Q(status='cancelled')),
+        last_visit=Max('date', filter=Q(status='completed')),
+    )
+    orders = _grouped(
+        [Order.objects.all(), ArchivedOrder.objects.all()], user_ids,
+        order_count=Count('id', filter=~Q(status='cancelled')),
+        lifetime_spend=Sum('total', filter=~Q(status='cancelled')),
+    )
+    stats = {}
+    for user_id in user_ids if user_ids is not None else bookings.keys() | orders.keys():
+        booking_stats, order_stats = bookings.get(user_id, {}), orders.get(user_id, {})
+        stats[user_id] = {
+            'booking_count': booking_stats.get('booking_count') or 0,
+            'order_count': order_stats.get('order_count') or 0,
+            'lifetime_spend': order_stats.get('lifetime_spend') or Decimal('0'),
+            'last_visit': booking_stats.get('last_visit'),
+        }
+    return stats
+
+
+def save_stats(stats):
+    """Insert or update the UserStats rows for a compute_stats() result in one statement"""
+    from .models import UserStats
+
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id, **values) for user_id, values in stats.items()],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=STAT_FIELDS + ['updated_at'],
+    )
+
+
+def refresh_user_stats(user_id):
+    """Recompute one user's counters; safe to run any number of times. None if the user is gone"""
+    from django.contrib.auth.models import User
+
+    if not User.objects.filter(pk=user_id).exists():
+        return None
+    stats = compute_stats([user_id])
+    save_stats(stats)
+    return stats[user_id]
+
+
+def rebuild_user_stats(batch_size=BATCH_SIZE):
+    """Recompute every user's counters, batch_size users per round of grouped queries"""
+    from django.contrib.auth.models import User
+
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(user_ids), batch_size):
+        save_stats(compute_stats(user_ids[start:start + batch_size]))
+    return len(user_ids)
@@ -3,21 +3,63 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Sum
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Count, Max, Sum
 from django.utils import timezone
 from datetime import datetime, date, timedelta
+from functools import partial
 from django.shortcuts import get_object_or_404
-from .models import Category, MenuItem, Table, Booking, Order, OrderItem
+from .models import (
+    Category, MenuItem, Table, Booking, WaitlistEntry, Order, OrderItem,
+    ArchivedBooking, ArchivedOrder, UserStats
+)
+from .filters import BookingFilter
+from .cache import (
+    CachedListMixin, booking_cache_version, menu_cache_version, table_cache_version,
+    user_cache_version
+)
+from .coalescing import single_flight
+from .conditional import ConditionalGetMixin
+from .dates import day_bounds
+from .reports import occupancy_report
+from . import renditions
+from .fast_serialization import FastListMixin
+from .allocation import find_best_table, seat_from_waitlist
+from .sparse_fields import SparseFieldsViewSetMixin
+from .expansion import ExpandableFieldsViewSetMixin
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, CategorySerializer,
-    MenuItemSerializer, TableSerializer, BookingSerializer,
-    OrderSerializer, OrderCreateSerializer, OrderItemSerializer
+    MenuItemSerializer, MenuItemBulkUpdateSerializer, TableSerializer, BookingSerializer,
+    WaitlistEntrySerializer, OrderSerializer, OrderCreateSerializer, OrderItemSerializer,
+    OrderBulkStatusSerializer, ArchivedBookingSerializer, ArchivedOrderSerializer, UserStatsSerializer
+)
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.core.files.storage import default_storage
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed, ParseError, ValidationError
+from rest_framework.views import APIView
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
+from .order_events import (
+    STREAM_TICKET_SECONDS, broker, issue_stream_ticket, latest_cursor, record_order_events, stream_ticket_user_id
 )
-from django.contrib.auth.models import User
+from .outbox import enqueue_many
+from .passwords import HashingBusy, run_hashing
+from .user_stats import refresh_user_stats
+import json
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, CachedListMixin, ExpandableFieldsViewSetMixin, SparseFieldsViewSetMixin,
+                      viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    list_cache = ('categories', menu_cache_version)
+    # Categories have no updated_at; every change moves the menu version
+    conditional_field = None
+    conditional_versions = (menu_cache_version,)
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
@@ -27,22 +69,83 @@ class CategoryViewSet(viewsets.ModelViewSet):
             return [permissions.IsAdminUser()]
         return [permissions.IsAuthenticated()]
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+class MenuItemViewSet(ConditionalGetMixin, CachedListMixin, FastListMixin, ExpandableFieldsViewSetMixin,
+                      SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
+    list_cache = ('menu', menu_cache_version)
+    # Items carry their category's name
+    conditional_versions = (menu_cache_version,)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'is_available']
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'price', 'category__name']
     
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk_update']:
             return [permissions.IsAdminUser()]
         return [permissions.IsAuthenticatedOrReadOnly()]
+    
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request):
+        """Reprice or change availability for many items in one UPDATE"""
+        serializer = MenuItemBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        items = MenuItem.objects.all()
+        if 'ids' in data:
+            items = items.filter(pk__in=data['ids'])
+        if 'category' in data:
+            items = items.filter(category=data['category'])
+        
+        try:
+            updated = items.apply_changes(
+                price=data.get('price'),
+                percentage=data.get('percentage'),
+                is_available=data.get('is_available')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'updated': updated})
+    
+    @action(detail=True, methods=['get'], url_path=r'image/(?P<size>[a-z]+)\.(?P<fmt>[a-z]+)')
+    def image(self, request, pk=None, size=None, fmt=None):
+        """Redirect to a resized rendition, generating it on first request"""
+        if size not in renditions.SIZES or fmt not in renditions.FORMATS:
+            return Response({'error': 'Unknown image size or format.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        image_name = get_object_or_404(MenuItem.objects.values_list('image', flat=True), pk=pk)
+        if not image_name:
+            return Response({'error': 'This menu item has no image.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        name = renditions.rendition_name(image_name, size, fmt)
+        if default_storage.exists(name):
+            renditions.touch(name)
+        else:
+            name = renditions.try_generate(image_name, size, fmt)
+            if name is None:
+                # Unreadable original: serve it as uploaded, and try again once it is replaced
+                if not default_storage.exists(image_name):
+                    return Response({'error': 'The image file is missing.'}, status=status.HTTP_404_NOT_FOUND)
+                response = HttpResponseRedirect(default_storage.url(image_name))
+                response['Cache-Control'] = 'no-cache'
+                return response
+            renditions.evict()
+        
+        response = HttpResponseRedirect(default_storage.url(name))
+        # URLs carry ?v=<upload>, so the redirect can be cached like the file itself
+        response['Cache-Control'] = 'public, max-age=86400'
+        return response
 
-class TableViewSet(viewsets.ModelViewSet):
+class TableViewSet(ConditionalGetMixin, CachedListMixin, FastListMixin, ExpandableFieldsViewSetMixin,
+                   SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Table.objects.all()
     serializer_class = TableSerializer
+    list_cache = ('tables', table_cache_version)
+    conditional_field = None
+    conditional_versions = (table_cache_version,)
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['capacity', 'is_available', 'location']
     ordering_fields = ['number', 'capacity']
@@ -52,17 +155,60 @@ class TableViewSet(viewsets.ModelViewSet):
             return [permissions.IsAdminUser()]
         return [permissions.IsAuthenticated()]
 
-class BookingViewSet(viewsets.ModelViewSet):
+# Every booking and table change moves to a new version, so results can live a minute
+@single_flight('available_slots', ttl=60, version=booking_cache_version)
+def compute_available_slots(booking_date, guests):
+    """Free slots on a date for a party size; bursts for the same date share one computation"""
+    # Get all time slots
+    all_slots = [slot[0] for slot in Booking.TIME_SLOTS]
+    
+    # Get tables that can accommodate the number of guests
+    suitable_tables = Table.objects.filter(
+        capacity__gte=guests,
+        is_available=True
+    )
+    
+    # Find available slots
+    available_slots = []
+    for slot in all_slots:
+        # Count how many suitable tables are available for this slot
+        booked_tables_count = Booking.objects.filter(
+            date=booking_date,
+            time_slot=slot,
+            status__in=['pending', 'confirmed']
+        ).count()
+    
+        available_tables_count = suitable_tables.count() - booked_tables_count
+    
+        if available_tables_count > 0:
+            available_slots.append({
+                'time_slot': slot,
+                'display_time': dict(Booking.TIME_SLOTS)[slot],
+                'available_tables': available_tables_count
+            })
+    
+    return available_slots
+
+class BookingViewSet(ConditionalGetMixin, FastListMixin, ExpandableFieldsViewSetMixin, SparseFieldsViewSetMixin,
+                     viewsets.ModelViewSet):
     serializer_class = BookingSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
-    filterset_fields = ['date', 'status', 'table']
+    filterset_class = BookingFilter
     search_fields = ['customer_name', 'customer_email', 'customer_phone']
-    ordering_fields = ['date', 'time_slot', 'created_at']
+    ordering_fields = ['date', 'time_slot', 'created_at', 'past_due']
+    # ?expand=table,user embeds the table and user; re-packing and auto-allocation
+    # move bookings between tables without touching updated_at, but bump the booking version
+    conditional_versions = (table_cache_version, booking_cache_version, user_cache_version)
     
     def get_queryset(self):
+        queryset = Booking.objects.with_past_due().select_related('table', 'user')
         if self.request.user.is_staff:
-            return Booking.objects.all()
-        return Booking.objects.filter(user=self.request.user)
+            return queryset
+        return queryset.filter(user=self.request.user)
+    
+    def conditional_aggregates(self):
+        # is_past_due turns true as time passes, without a write
+        return {'past_due': Count('pk', filter=Booking.objects.past_due_q())}
     
     def get_permissions(self):
         if self.action in ['create']:
@@ -72,7 +218,20 @@ class BookingViewSet(viewsets.ModelViewSet):
         return [permissions.IsAuthenticated()]
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        data = serializer.validated_data
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    serializer.save(user=self.request.user)
+                return
+            except IntegrityError:
+                if not data.get('table_auto_assigned'):
+                    raise ValidationError("This table is already booked for the selected date and time.")
+            # Another request took the allocated table first; try the next best one
+            data['table'] = find_best_table(data['date'], data['time_slot'], data['number_of_guests'])
+            if data['table'] is None:
+                break
+        raise ValidationError("No table for this party is free at the selected date and time.")
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -91,6 +250,8 @@ class BookingViewSet(viewsets.ModelViewSet):
         
         booking.status = 'cancelled'
         booking.save()
+        # Hand the freed table straight to the waitlist; the cancellation stands even if this fails
+        seat_from_waitlist(booking.table, booking.date, booking.time_slot)
         
         serializer = self.get_serializer(booking)
         return Response(serializer.data)
@@ -116,33 +277,7 @@ class BookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get all time slots
-        all_slots = [slot[0] for slot in Booking.TIME_SLOTS]
-        
-        # Get tables that can accommodate the number of guests
-        suitable_tables = Table.objects.filter(
-            capacity__gte=guests,
-            is_available=True
-        )
-        
-        # Find available slots
-        available_slots = []
-        for slot in all_slots:
-            # Count how many suitable tables are available for this slot
-            booked_tables_count = Booking.objects.filter(
-                date=booking_date,
-                time_slot=slot,
-                status__in=['pending', 'confirmed']
-            ).count()
-            
-            available_tables_count = suitable_tables.count() - booked_tables_count
-            
-            if available_tables_count > 0:
-                available_slots.append({
-                    'time_slot': slot,
-                    'display_time': dict(Booking.TIME_SLOTS)[slot],
-                    'available_tables': available_tables_count
-                })
+        available_slots = compute_available_slots(booking_date, guests)
         
         return Response({
             'date': date_str,
@@ -150,8 +285,43 @@ class BookingViewSet(viewsets.ModelViewSet):
             'available_slots': available_slots
         })
 
-class OrderViewSet(viewsets.ModelViewSet):
+class WaitlistEntryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    serializer_class = WaitlistEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['date', 'time_slot', 'status']
+    ordering_fields = ['date', 'time_slot', 'created_at']
+    http_method_names = ['get', 'post', 'head', 'options']
+    
+    def get_queryset(self):
+        queryset = WaitlistEntry.objects.select_related('booking')
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        entry = self.get_object()
+        if entry.status != 'waiting':
+            return Response(
+                {'error': f'Cannot leave the waitlist once the entry is {entry.status}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        entry.status = 'cancelled'
+        entry.save(update_fields=['status', 'updated_at'])
+        
+        serializer = self.get_serializer(entry)
+        return Response(serializer.data)
+
+class OrderViewSet(ConditionalGetMixin, ExpandableFieldsViewSetMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
+    # Items carry their menu item's name, booking_info and ?expand=booking,user
+    # the booking, its table and the user
+    conditional_versions = (menu_cache_version, booking_cache_version, table_cache_version, user_cache_version)
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'booking']
     ordering_fields = ['created_at', 'total']
@@ -161,13 +331,17 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Order.objects.all()
         return Order.objects.filter(user=self.request.user)
     
+    def conditional_aggregates(self):
+        return {'booking_updated_at': Max('booking__updated_at')}
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return OrderCreateSerializer
         return OrderSerializer
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        order = serializer.save(user=self.request.user)
+        record_order_events([order], 'created')
     
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
@@ -186,48 +360,268 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        previous_status = order.status
         order.status = new_status
         order.save()
+        record_order_events([order], 'status', {order.pk: previous_status})
         
         serializer = self.get_serializer(order)
         return Response(serializer.data)
-
-# Authentication views
-@api_view(['POST'])
-@permission_classes([])
-def register(request):
-    serializer = UserRegistrationSerializer(data=request.data)
-    if serializer.is_valid():
-        user = serializer.save()
-        token, created = Token.objects.get_or_create(user=user)
-        return Response({
-            'user': UserSerializer(user).data,
-            'token': token.key
-        }, status=status.HTTP_201_CREATED)
     
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        """Move many orders at once, with one UPDATE per target status"""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Only staff members can update order status.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = OrderBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = serializer.validated_data['changes']
+        
+        results = {}
+        by_target = {}
+        with transaction.atomic():
+            current = dict(
+                Order.objects.select_for_update().filter(pk__in=changes).values_list('id', 'status')
+            )
+            for order_id, new_status in changes.items():
+                previous_status = current.get(order_id)
+                if previous_status is None:
+                    results[order_id] = {'id': order_id, 'result': 'error', 'error': 'Order not found.'}
+                elif previous_status == new_status:
+                    results[order_id] = {'id': order_id, 'result': 'unchanged', 'status': new_status}
+                elif new_status not in Order.STATUS_TRANSITIONS[previous_status]:
+                    results[order_id] = {
+                        'id': order_id,
+                        'result': 'error',
+                        'status': previous_status,
+                        'error': f'Cannot change status from {previous_status} to {new_status}.'
+                    }
+                else:
+                    by_target.setdefault(new_status, []).append(order_id)
+                    results[order_id] = {
+                        'id': order_id,
+                        'result': 'updated',
+                        'status': new_status,
+                        'previous_status': previous_status
+                    }
+            
+            now = timezone.now()
+            for new_status, order_ids in by_target.items():
+                Order.objects.filter(pk__in=order_ids).update(status=new_status, updated_at=now)
+            
+            updated = [Order(pk=order_id, status=new_status)
+                       for new_status, order_ids in by_target.items() for order_id in order_ids]
+            if updated:
+                record_order_events(updated, 'status', {order.pk: current[order.pk] for order in updated})
+            # Only a cancellation changes what the customers' counters include
+            if by_target.get('cancelled'):
+                user_ids = Order.objects.filter(pk__in=by_target['cancelled']).order_by().values_list(
+                    'user_id', flat=True
+                ).distinct()
+                enqueue_many('user.stats', [{'user_id': user_id} for user_id in user_ids])
+        
+        return Response({
+            'updated': len(updated),
+            'results': [results[order_id] for order_id in changes]
+        })
+
+# Kitchen order feed
+# These are plain async Django views so that, under ASGI, an idle subscriber
+# is a suspended coroutine rather than a blocked worker thread.
+SSE_HEARTBEAT_SECONDS = 15
+LONG_POLL_TIMEOUT_SECONDS = 25
+
+def _authenticate_staff(request):
+    """Token header, ?ticket= from order_stream_ticket (EventSource cannot set headers) or session auth"""
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = stream_ticket_user_id(ticket)
+        user = User.objects.filter(pk=user_id).first() if user_id is not None else None
+        if user is None:
+            raise AuthenticationFailed('Invalid or expired stream ticket.')
+    else:
+        result = TokenAuthentication().authenticate(request)
+        # The API-only profile has no session middleware, hence no request.user
+        user = result[0] if result else getattr(request, 'user', AnonymousUser())
+    if user.is_authenticated and user.is_active and user.is_staff:
+        return user
+    return None
+
+def _parse_cursor(request):
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('cursor')
+    if cursor is None:
+        return None
+    try:
+        return max(int(cursor), 0)
+    except ValueError:
+        raise ValueError('Invalid cursor parameter.')
+
+async def _feed_request(request):
+    try:
+        user = await sync_to_async(_authenticate_staff)(request)
+    except AuthenticationFailed as e:
+        return None, None, JsonResponse({'error': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if user is None:
+        return None, None, JsonResponse(
+            {'error': 'Only staff members can follow the order feed.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    try:
+        cursor = _parse_cursor(request)
+    except ValueError as e:
+        return None, None, JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if cursor is None:
+        # New clients load open orders once and follow changes from now on
+        cursor = await sync_to_async(latest_cursor)()
+    return user, cursor, None
 
 @api_view(['POST'])
-@permission_classes([])
-def login(request):
-    from django.contrib.auth import authenticate
+@permission_classes([permissions.IsAdminUser])
+def order_stream_ticket(request):
+    """Short-lived ticket for ?ticket= on the feed URLs, so the API token never appears in a URL.
+
+    Once it expires the stream answers 401 and the client fetches a new one
+    before reconnecting.
+    """
+    return Response({'ticket': issue_stream_ticket(request.user), 'expires_in': STREAM_TICKET_SECONDS})
+
+async def order_event_stream(request):
+    """Server-Sent Events stream of order creations and status changes"""
+    user, cursor, error = await _feed_request(request)
+    if error:
+        return error
     
-    username = request.data.get('username')
-    password = request.data.get('password')
+    async def events(cursor):
+        yield f'retry: 3000\nid: {cursor}\n\n'
+        while True:
+            batch = await broker.wait(cursor, SSE_HEARTBEAT_SECONDS)
+            if not batch:
+                yield ': keepalive\n\n'
+                continue
+            for event in batch:
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            cursor = batch[-1]['id']
     
-    user = authenticate(username=username, password=password)
+    response = StreamingHttpResponse(events(cursor), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+async def order_event_poll(request):
+    """Long-poll variant of the order feed: returns as soon as there are events after cursor"""
+    user, cursor, error = await _feed_request(request)
+    if error:
+        return error
     
-    if user:
-        token, created = Token.objects.get_or_create(user=user)
-        return Response({
-            'token': token.key,
-            'user': UserSerializer(user).data
-        })
+    batch = await broker.wait(cursor, LONG_POLL_TIMEOUT_SECONDS)
+    return JsonResponse({
+        'cursor': batch[-1]['id'] if batch else cursor,
+        'events': batch
+    })
+
+# Authentication views
+# register and login are async so a burst of logins waits on the bounded hashing
+# pool (restaurant.passwords) instead of holding the thread every sync view runs on.
+class AuthView(APIView):
+    """Parsing, throttling and rendering for the async register and login views.
+
+    DRF views are sync only, so those views drive one of these by hand:
+    begin() runs what dispatch() does before a handler and finish() what it
+    does after, so the answers are negotiated like any other endpoint's.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    
+    def begin(self, request):
+        """(data, None), or (None, error response) for a throttled or malformed request"""
+        self.args, self.kwargs = (), {}
+        self.request = self.initialize_request(request)
+        self.headers = self.default_response_headers
+        try:
+            self.initial(self.request)
+            data = self.request.data
+            if not hasattr(data, 'get'):
+                raise ParseError('Expected an object.')
+        except Exception as exc:
+            return None, self.finish(self.handle_exception(exc))
+        return data, None
     
+    def finish(self, response):
+        return self.finalize_response(self.request, response).render()
+
+def _hashing_busy():
     return Response(
+        {'error': 'Too many sign-ins in progress, please retry shortly.'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': '1'}
+    )
+
+def _register_user(serializer, password_hash):
+    user = serializer.save(password_hash=password_hash)
+    token, created = Token.objects.get_or_create(user=user)
+    return {
+        'user': UserSerializer(user).data,
+        'token': token.key
+    }
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    view = AuthView()
+    data, error = await sync_to_async(view.begin)(request)
+    if error:
+        return error
+    
+    serializer = UserRegistrationSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return await sync_to_async(view.finish)(Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST))
+    
+    try:
+        password_hash = await run_hashing(make_password, serializer.validated_data['password'])
+    except HashingBusy:
+        return await sync_to_async(view.finish)(_hashing_busy())
+    
+    payload = await sync_to_async(_register_user)(serializer, password_hash)
+    return await sync_to_async(view.finish)(Response(payload, status=status.HTTP_201_CREATED))
+
+def _login_payload(user):
+    token, created = Token.objects.get_or_create(user=user)
+    return {
+        'token': token.key,
+        'user': UserSerializer(user).data
+    }
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    view = AuthView()
+    data, error = await sync_to_async(view.begin)(request)
+    if error:
+        return error
+    
+    username = data.get('username')
+    password = data.get('password')
+    
+    # The configured backends check the password in the hashing pool; ModelBackend
+    # also hashes for unknown usernames, upgrades outdated hashes and sends
+    # user_login_failed for lockout and audit hooks
+    try:
+        user = await run_hashing(partial(authenticate, request, username=username, password=password))
+    except HashingBusy:
+        return await sync_to_async(view.finish)(_hashing_busy())
+    
+    if user is not None:
+        payload = await sync_to_async(_login_payload)(user)
+        return await sync_to_async(view.finish)(Response(payload))
+    
+    return await sync_to_async(view.finish)(Response(
         {'error': 'Invalid credentials.'},
         status=status.HTTP_400_BAD_REQUEST
-    )
+    ))
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -244,30 +638,67 @@ def logout(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def user_profile(request):
-    serializer = UserSerializer(request.user)
-    return Response(serializer.data)
+    """The user with their activity counters, read from one UserStats row"""
+    try:
+        stats = UserStatsSerializer(request.user.stats).data
+    except UserStats.DoesNotExist:
+        # Not built yet for this user (new account, or before rebuild_user_stats ran)
+        refresh_user_stats(request.user.pk)
+        stats = UserStatsSerializer(UserStats.objects.get(user=request.user)).data
+    return Response({**UserSerializer(request.user).data, 'stats': stats})
+
+class ArchivedBookingViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """Finished bookings moved out of the hot table; read only"""
+    serializer_class = ArchivedBookingSerializer
+    # Rows carry their table's number
+    conditional_versions = (table_cache_version,)
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['date', 'status']
+    ordering_fields = ['date', 'created_at']
+    
+    def get_queryset(self):
+        queryset = ArchivedBooking.objects.select_related('table')
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+class ArchivedOrderViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """Finished orders moved out of the hot table, with their items; read only"""
+    serializer_class = ArchivedOrderSerializer
+    conditional_versions = (menu_cache_version,)
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status', 'booking_id']
+    ordering_fields = ['created_at', 'total']
+    
+    def get_queryset(self):
+        queryset = ArchivedOrder.objects.prefetch_related('items__menu_item')
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user=self.request.user)
 
 # Dashboard and analytics
-@api_view(['GET'])
-@permission_classes([permissions.IsAdminUser])
-def dashboard_stats(request):
-    """Get dashboard statistics for admin"""
+# Past the 5 seconds one caller refreshes while the rest are served the previous figures
+@single_flight('dashboard_stats', ttl=5, stale_ttl=60)
+def compute_dashboard_stats():
+    """Dashboard figures, computed once per few seconds however many admin screens ask"""
     
     # Bookings statistics
     total_bookings = Booking.objects.count()
     today_bookings = Booking.objects.filter(date=date.today()).count()
     pending_bookings = Booking.objects.filter(status='pending').count()
     
-    # Orders statistics
+    # Orders statistics; today is a created_at range so the index can be used
+    today_start, today_end = day_bounds(timezone.localdate())
+    today_orders_queryset = Order.objects.filter(created_at__gte=today_start, created_at__lt=today_end)
     total_orders = Order.objects.count()
-    today_orders = Order.objects.filter(created_at__date=date.today()).count()
+    today_orders = today_orders_queryset.count()
     pending_orders = Order.objects.filter(status='pending').count()
     
     # Revenue statistics
     total_revenue = Order.objects.aggregate(total=Sum('total'))['total'] or 0
-    today_revenue = Order.objects.filter(
-        created_at__date=date.today()
-    ).aggregate(total=Sum('total'))['total'] or 0
+    today_revenue = today_orders_queryset.aggregate(total=Sum('total'))['total'] or 0
     
     # Popular menu items
     popular_items = OrderItem.objects.values(
@@ -276,7 +707,7 @@ def dashboard_stats(request):
         total_ordered=Sum('quantity')
     ).order_by('-total_ordered')[:5]
     
-    return Response({
+    return {
         'bookings': {
             'total': total_bookings,
             'today': today_bookings,
@@ -292,4 +723,34 @@ def dashboard_stats(request):
             'today': float(today_revenue)
         },
         'popular_items': list(popular_items)
-    })
\ No newline at end of file
+    }
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def dashboard_stats(request):
+    """Get dashboard statistics for admin"""
+    return Response(compute_dashboard_stats())
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def occupancy_heatmap(request):
+    """Seat utilization per table, location, weekday and time slot for a date range"""
+    try:
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if request.GET.get('end') else date.today()
+        start = (
+            datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+            if request.GET.get('start') else end - timedelta(days=89)
+        )
+    except ValueError:
+        return Response(
+            {'error': 'Invalid start or end parameter.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if start > end:
+        return Response(
+            {'error': 'start must not be after end.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response(occupancy_report(start, end))